@@ -1,16 +1,44 @@
 import os
-from flask import Flask
-from flask_cors import CORS
-from config import Config
-from routes.auth import auth_bp
-from routes.upload import upload_bp
-from routes.analysis import analysis_bp
+import orjson
+from flask import Flask, Response, request
+from config import Config, get_config
+
+# Health payload never changes, so serialize it once
+_HEALTH_BYTES = orjson.dumps({'status': 'healthy', 'message': 'Log Analyzer API is running'})
+
+# Frontend deployments allowed to call the API
+_ALLOWED_ORIGINS = frozenset({
+    'https://log-analyzer-sepia.vercel.app',
+    'https://log-analyzer-suparshwa31s-projects.vercel.app',
+    'https://log-analyzer-git-main-suparshwa31s-projects.vercel.app'
+})
+
+def _apply_cors(response):
+    """Add CORS headers for requests coming from an allowed origin"""
+    response.vary.add('Origin')
+    origin = request.headers.get('Origin')
+    if origin not in _ALLOWED_ORIGINS:
+        return response
+    
+    headers = response.headers
+    headers['Access-Control-Allow-Origin'] = origin
+    headers['Access-Control-Allow-Credentials'] = 'true'
+    
+    # Preflight: allow the route's methods and whatever headers were requested
+    if request.method == 'OPTIONS':
+        if 'Allow' in headers:
+            headers['Access-Control-Allow-Methods'] = headers['Allow']
+        requested_headers = request.headers.get('Access-Control-Request-Headers')
+        if requested_headers:
+            headers['Access-Control-Allow-Headers'] = requested_headers
+    
+    return response
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     
     # Initialize configuration
-    config = config_class()
+    config = get_config() if config_class is Config else config_class()
     config.init_app(app)
     
     # Set Flask configuration
@@ -22,23 +50,27 @@ def create_app(config_class=Config):
     app.config['ALLOWED_EXTENSIONS'] = config.ALLOWED_EXTENSIONS
     app.config['MAX_LOG_SIZE'] = config.MAX_LOG_SIZE
     app.config['OPENAI_API_KEY'] = config.OPENAI_API_KEY
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
     
     # Enable CORS for frontend communication
-    allowed_origins = [
-        'https://log-analyzer-sepia.vercel.app',
-        'https://log-analyzer-suparshwa31s-projects.vercel.app',
-        'https://log-analyzer-git-main-suparshwa31s-projects.vercel.app'
-    ]
-    CORS(app, origins=allowed_origins, supports_credentials=True)
-    
-    # Register blueprints
+    app.after_request(_apply_cors)
+    
+    # Register blueprints (imported here so importing this module stays cheap)
+    from routes.auth import auth_bp
+    from routes.upload import upload_bp
+    from routes.analysis import analysis_bp
+    
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(upload_bp, url_prefix='/api/upload')
     app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
     
     @app.route('/health')
     def health_check():
-        return {'status': 'healthy', 'message': 'Log Analyzer API is running'}
+        return Response(
+            _HEALTH_BYTES,
+            mimetype='application/json',
+            headers={'Cache-Control': 'public, max-age=30'}
+        )
     
     return app
 
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
 from typing import List, Optional
@@ -25,6 +26,8 @@ class Config(BaseSettings):
     openai_api_key: Optional[str] = Field(default=None, alias='OPENAI_API_KEY')
     
     # Development Configuration
+    # Accept JWTs by decoding them without signature verification when Supabase can't check them; never enable in production
+    allow_unverified_jwt: bool = Field(default=False, alias='ALLOW_UNVERIFIED_JWT')
     host: str = Field(default='0.0.0.0', alias='HOST')
     port: int = Field(default=5000, alias='PORT')
     
@@ -40,56 +43,32 @@ class Config(BaseSettings):
             raise ValueError('Port must be between 1 and 65535')
         return v
     
-    @property
-    def DEBUG(self) -> bool:
-        return self.debug
-    
-    @property
-    def SUPABASE_URL(self) -> str:
-        return self.supabase_url
-    
-    @property
-    def SUPABASE_ANON_KEY(self) -> str:
-        return self.supabase_anon_key
-    
-    @property
-    def SUPABASE_SERVICE_ROLE_KEY(self) -> str:
-        return self.supabase_service_role_key
-    
-    @property
-    def SUPABASE_BUCKET(self) -> str:
-        return self.supabase_bucket
-    
-    @property
-    def MAX_CONTENT_LENGTH(self) -> int:
-        return self.max_content_length
-    
-    @property
-    def UPLOAD_FOLDER(self) -> str:
-        # Ensure absolute path
-        if os.path.isabs(self.upload_folder):
-            return self.upload_folder
-        return os.path.join(os.path.dirname(os.path.abspath(__file__)), self.upload_folder)
-    
-    @property
-    def ALLOWED_EXTENSIONS(self) -> set:
-        return set(self.allowed_extensions)
-    
-    @property
-    def MAX_LOG_SIZE(self) -> int:
-        return self.max_log_size
-    
-    @property
-    def OPENAI_API_KEY(self) -> Optional[str]:
-        return self.openai_api_key
-    
-    @property
-    def HOST(self) -> str:
-        return self.host
-    
-    @property
-    def PORT(self) -> int:
-        return self.port
+    def model_post_init(self, __context) -> None:
+        """Expose the uppercase settings as plain attributes, resolved once"""
+        upload_folder = self.upload_folder
+        if not os.path.isabs(upload_folder):
+            # Ensure absolute path
+            upload_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), upload_folder)
+        
+        aliases = {
+            'DEBUG': self.debug,
+            'SUPABASE_URL': self.supabase_url,
+            'SUPABASE_ANON_KEY': self.supabase_anon_key,
+            'SUPABASE_SERVICE_ROLE_KEY': self.supabase_service_role_key,
+            'SUPABASE_BUCKET': self.supabase_bucket,
+            'MAX_CONTENT_LENGTH': self.max_content_length,
+            'UPLOAD_FOLDER': upload_folder,
+            # Lowercased so callers can compare against ext.lower() with one set probe
+            'ALLOWED_EXTENSIONS': frozenset(ext.lower() for ext in self.allowed_extensions),
+            'MAX_LOG_SIZE': self.max_log_size,
+            'OPENAI_API_KEY': self.openai_api_key,
+            'ALLOW_UNVERIFIED_JWT': self.allow_unverified_jwt,
+            'HOST': self.host,
+            'PORT': self.port,
+        }
+        # Bypass pydantic's __setattr__, which only accepts declared fields
+        for name, value in aliases.items():
+            object.__setattr__(self, name, value)
     
     class Config:
         env_file = '.env'
@@ -99,3 +78,8 @@ class Config(BaseSettings):
     def init_app(self, app):
         # Ensure upload directory exists
         os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Return the process-wide Config, reading the environment only once"""
+    return Config()
@@ -0,0 +1,20 @@
+"""
+Gunicorn settings for serving the backend in production:
+
+    gunicorn "app:create_app()"
+"""
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+
+# Threaded workers so slow uploads and /analyze requests don't block each other
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Large log files can take a while to parse
+timeout = 120
+
+# Load the app once in the master so workers share config and compiled patterns
+preload_app = True
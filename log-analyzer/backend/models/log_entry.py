@@ -1,9 +1,30 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
-from dataclasses import dataclass, asdict
-import json
+from dataclasses import dataclass
+from enum import IntEnum
+import orjson
 
-@dataclass
+class LogLevelInt(IntEnum):
+    """Numeric log severity, ordered so level checks are integer comparisons"""
+    DEBUG = 0
+    INFO = 1
+    WARNING = 2
+    ERROR = 3
+    CRITICAL = 4
+    FATAL = 5
+
+# Level name -> severity, shared by every LogEntry
+_SEVERITY_MAP = {
+    'DEBUG': LogLevelInt.DEBUG,
+    'INFO': LogLevelInt.INFO,
+    'WARNING': LogLevelInt.WARNING,
+    'WARN': LogLevelInt.WARNING,
+    'ERROR': LogLevelInt.ERROR,
+    'CRITICAL': LogLevelInt.CRITICAL,
+    'FATAL': LogLevelInt.FATAL
+}
+
+@dataclass(slots=True)
 class LogEntry:
     """Data model for log entries"""
     
@@ -37,21 +58,50 @@ class LogEntry:
     anomaly_type: Optional[str] = None
     tags: Optional[list] = None
     
+    @property
+    def severity(self) -> LogLevelInt:
+        """Numeric severity of the current level; unknown levels count as INFO"""
+        return _SEVERITY_MAP.get(self.level.upper(), LogLevelInt.INFO)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        data = asdict(self)
+        created_at = self.created_at
+        updated_at = self.updated_at
+        tags = self.tags
         
         # Handle datetime objects
-        if data.get('created_at') and isinstance(data['created_at'], datetime):
-            data['created_at'] = data['created_at'].isoformat()
-        if data.get('updated_at') and isinstance(data['updated_at'], datetime):
-            data['updated_at'] = data['updated_at'].isoformat()
+        if created_at and isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        if updated_at and isinstance(updated_at, datetime):
+            updated_at = updated_at.isoformat()
         
         # Handle tags
-        if data.get('tags') and isinstance(data['tags'], list):
-            data['tags'] = json.dumps(data['tags'])
+        if isinstance(tags, list):
+            tags = orjson.dumps(tags).decode() if tags else []
         
-        return data
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'level': self.level,
+            'message': self.message,
+            'service': self.service,
+            'format': self.format,
+            'line_number': self.line_number,
+            'raw_line': self.raw_line,
+            'ip_address': self.ip_address,
+            'method': self.method,
+            'url': self.url,
+            'status_code': self.status_code,
+            'response_size': self.response_size,
+            'hostname': self.hostname,
+            'user_id': self.user_id,
+            'file_id': self.file_id,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'anomaly_score': self.anomaly_score,
+            'anomaly_type': self.anomaly_type,
+            'tags': tags
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'LogEntry':
@@ -59,8 +109,8 @@ class LogEntry:
         # Handle tags
         if data.get('tags') and isinstance(data['tags'], str):
             try:
-                data['tags'] = json.loads(data['tags'])
-            except json.JSONDecodeError:
+                data['tags'] = orjson.loads(data['tags'])
+            except orjson.JSONDecodeError:
                 data['tags'] = []
         
         # Handle datetime strings
@@ -106,28 +156,20 @@ class LogEntry:
     
     def is_error(self) -> bool:
         """Check if this is an error log"""
-        return self.level.upper() in ['ERROR', 'CRITICAL', 'FATAL']
+        return self.severity >= LogLevelInt.ERROR
     
     def is_warning(self) -> bool:
         """Check if this is a warning log"""
-        return self.level.upper() in ['WARNING', 'WARN']
+        return self.severity == LogLevelInt.WARNING
     
     def is_info(self) -> bool:
         """Check if this is an info log"""
-        return self.level.upper() in ['INFO', 'DEBUG']
+        severity = _SEVERITY_MAP.get(self.level.upper())
+        return severity is not None and severity <= LogLevelInt.INFO
     
     def get_severity_score(self) -> int:
         """Get numeric severity score"""
-        severity_map = {
-            'DEBUG': 0,
-            'INFO': 1,
-            'WARNING': 2,
-            'WARN': 2,
-            'ERROR': 3,
-            'CRITICAL': 4,
-            'FATAL': 5
-        }
-        return severity_map.get(self.level.upper(), 1)
+        return int(self.severity)
     
     def add_tag(self, tag: str):
         """Add a tag to the log entry"""
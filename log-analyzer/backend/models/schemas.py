@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, validator
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
@@ -48,6 +48,9 @@ class TimelineRequest(BaseModel):
 
 # Response Models
 class LogEntryResponse(BaseModel):
+    # Keep enum fields as their plain string values so dumps skip Enum.value lookups
+    model_config = ConfigDict(use_enum_values=True)
+    
     line_number: int = Field(..., description="Line number in the log file")
     timestamp: Optional[str] = Field(None, description="Parsed timestamp")
     level: LogLevel = Field(..., description="Log level")
@@ -78,6 +81,8 @@ class LogEntryResponse(BaseModel):
     tags: Optional[List[str]] = Field(None, description="Tags associated with the log entry")
 
 class AnomalyResponse(BaseModel):
+    model_config = ConfigDict(use_enum_values=True)
+    
     type: AnomalyType = Field(..., description="Type of anomaly")
     severity: AnomalySeverity = Field(..., description="Severity level")
     description: str = Field(..., description="Human-readable description")
@@ -119,6 +124,14 @@ class UploadResponse(BaseModel):
     filename: str = Field(..., description="Uploaded filename")
     file_path: str = Field(..., description="Path to uploaded file")
     parse_result: Optional[List[Dict[str, Any]]] = Field(None, description="Parsing result")
+    job_id: Optional[str] = Field(None, description="Background parse job ID when parsing was deferred")
+
+class ParseJobResponse(BaseModel):
+    job_id: str = Field(..., description="Background parse job ID")
+    state: str = Field(..., description="Job state: queued, running, finished or failed")
+    file_path: str = Field(..., description="Path to the file being parsed")
+    parse_result: Optional[List[Dict[str, Any]]] = Field(None, description="Parsing result once finished")
+    error: Optional[str] = Field(None, description="Error message if parsing failed")
 
 class DeleteFileResponse(BaseModel):
     message: str = Field(..., description="Deletion status message")
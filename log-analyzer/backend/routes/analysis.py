@@ -1,122 +1,108 @@
-from flask import Blueprint, request, jsonify, current_app
-from services.anomalies import AnomalyDetector
-from services.parser import LogParser
-from services.ai_helpers import AIHelper
+from flask import Blueprint, request, current_app, g
+from services.anomalies import get_detector
+from services.parser import get_parser
+from services.ai_helpers import get_ai_helper
+from services.aggregation import aggregate_levels
 from routes.auth import require_auth
 from models.schemas import (
     AnalysisRequest, AnomalyRequest, TimelineRequest,
     AnalysisResultResponse, AnomalyResponse, TimelineDataResponse,
-    StatisticsResponse, AISummaryResponse, LogLevel
+    StatisticsResponse, AISummaryResponse
 )
-from pydantic import ValidationError
-import json
+from utils.http import json_response, model_response, raw_json_response
+from utils.result_cache import result_cache
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Any, Dict, List, Type
+from functools import wraps
 
 analysis_bp = Blueprint('analysis', __name__)
 
+# Seconds /analyze waits for the background AI summary before answering with the basic one
+_AI_SUMMARY_TIMEOUT = 30
+
+_ANOMALY_LIST_ADAPTER = TypeAdapter(List[AnomalyResponse])
+
+def validate_body(schema: Type[BaseModel]):
+    """Decode and validate the JSON body once, leaving the model on g.req_model"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            request_data = request.get_json(silent=True)
+            if not request_data:
+                return json_response({'error': 'Request body is required'}), 400
+            
+            try:
+                g.req_model = schema.model_validate(request_data)
+            except ValidationError as e:
+                return json_response({'error': 'Invalid request data', 'details': e.errors()}), 400
+            
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def _anomaly_responses(anomalies: List[Dict[str, Any]]) -> List[AnomalyResponse]:
+    """Validate detector output into response models in one call to the list validator"""
+    return _ANOMALY_LIST_ADAPTER.validate_python([
+        {
+            'type': anomaly.get('type', 'unknown'),
+            'severity': anomaly.get('severity', 'low'),
+            'description': anomaly.get('description', ''),
+            'timestamp': anomaly.get('timestamp'),
+            'details': anomaly.get('details', {})
+        }
+        for anomaly in anomalies
+    ])
+
 @analysis_bp.route('/analyze', methods=['POST'])
 @require_auth
+@validate_body(AnalysisRequest)
 def analyze_logs():
     """Analyze uploaded log file for anomalies and insights"""
     try:
-        # Validate request data
-        request_data = request.get_json()
-        if not request_data:
-            return jsonify({'error': 'Request body is required'}), 400
+        validated_request = g.req_model
         
-        validated_request = AnalysisRequest(**request_data)
+        # Serve repeat requests for an unchanged file from the result cache
+        cache_key = result_cache.make_key(validated_request.file_path, 'analyze', bool(current_app.config.get('OPENAI_API_KEY')))
+        cached_body = result_cache.get(cache_key)
+        if cached_body is not None:
+            return raw_json_response(cached_body)
         
         # Parse the log file with performance optimizations
-        parser = LogParser()
-        # Process all lines without sampling
-        parsed_logs = parser.parse_file(validated_request.file_path, max_lines=20000, sample_rate=1.0)
+        parser = get_parser()
+        # Process all lines without sampling; only derived results are returned, so raw lines are not kept
+        parsed_logs = parser.parse_file(validated_request.file_path, max_lines=20000, sample_rate=1.0, keep_raw=False)
         
         # Detect anomalies
-        detector = AnomalyDetector()
+        detector = get_detector()
         anomalies = detector.detect_anomalies(parsed_logs)
         
-        # Generate AI summary if available
-        ai_summary = None
+        # Start the AI summary in the background so the OpenAI round trip overlaps the aggregation below
+        ai_helper = get_ai_helper()
+        ai_future = None
         if current_app.config.get('OPENAI_API_KEY'):
-            ai_helper = AIHelper()
-            ai_summary = ai_helper.generate_summary(parsed_logs, anomalies)
-        
-        # Generate timeline data for visualization (optimized)
-        timeline_data = {}
-        from datetime import datetime
-        from collections import defaultdict
-        
-        # Use defaultdict for better performance
-        hourly_stats = defaultdict(lambda: {'total': 0, 'errors': 0, 'warnings': 0, 'info': 0})
-        
-        for log in parsed_logs:
-            timestamp = log.get('timestamp')
-            if not timestamp:
-                continue
-                
-            try:
-                # Simplified timestamp parsing for performance
-                if isinstance(timestamp, str):
-                    dt = None
-                    # Try most common format first
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    except (ValueError, AttributeError):
-                        try:
-                            dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            continue  # Skip unparseable timestamps
-                    
-                    if dt:
-                        hour_key = dt.strftime('%Y-%m-%d %H:00:00')
-                        hourly_stats[hour_key]['total'] += 1
-                        
-                        level = log.get('level', 'INFO').upper()
-                        if level in ['ERROR', 'CRITICAL', 'FATAL']:
-                            hourly_stats[hour_key]['errors'] += 1
-                        elif level in ['WARNING', 'WARN']:
-                            hourly_stats[hour_key]['warnings'] += 1
-                        else:
-                            hourly_stats[hour_key]['info'] += 1
-                            
-            except Exception:
-                continue
-        
-        # Convert defaultdict to regular dict
-        timeline_data = dict(hourly_stats)
-        
+            ai_future = ai_helper.generate_summary_async(parsed_logs, anomalies)
         
-        # Prepare analysis results (optimized to avoid multiple list comprehensions)
-        error_count = 0
-        warning_count = 0
-        info_count = 0
-        
-        for log in parsed_logs:
-            level = log.get('level', '').upper()
-            if level in ['ERROR', 'CRITICAL', 'FATAL']:
-                error_count += 1
-            elif level in ['WARNING', 'WARN']:
-                warning_count += 1
-            else:
-                info_count += 1
+        # Build timeline data and level statistics in a single pass
+        timeline_data, level_totals = aggregate_levels(parsed_logs)
         
         statistics = StatisticsResponse(
-            error_count=error_count,
-            warning_count=warning_count,
-            info_count=info_count
+            error_count=level_totals['errors'],
+            warning_count=level_totals['warnings'],
+            info_count=level_totals['info']
         )
         
         # Convert anomalies to Pydantic models
-        anomaly_responses = []
-        for anomaly in anomalies:
-            anomaly_responses.append(AnomalyResponse(
-                type=anomaly.get('type', 'unknown'),
-                severity=anomaly.get('severity', 'low'),
-                description=anomaly.get('description', ''),
-                timestamp=anomaly.get('timestamp'),
-                details=anomaly.get('details', {})
-            ))
+        anomaly_responses = _anomaly_responses(anomalies)
         
         # Create AI summary response if available
+        ai_summary = None
+        if ai_future:
+            try:
+                ai_summary = ai_future.result(timeout=_AI_SUMMARY_TIMEOUT)
+            except TimeoutError:
+                # Free the executor slot if the summary never started, and answer without the AI
+                ai_future.cancel()
+                ai_summary = ai_helper._generate_basic_summary(parsed_logs, anomalies)
         ai_summary_response = None
         if ai_summary:
             ai_summary_response = AISummaryResponse(
@@ -125,7 +111,8 @@ def analyze_logs():
                 recommendations=ai_summary.get('recommendations', [])
             )
         
-        analysis_result = AnalysisResultResponse(
+        # Every field is already a validated model or built by aggregate_levels, so skip revalidating the timeline
+        analysis_result = AnalysisResultResponse.model_construct(
             total_entries=len(parsed_logs),
             anomalies=anomaly_responses,
             ai_summary=ai_summary_response,
@@ -133,30 +120,34 @@ def analyze_logs():
             timeline=timeline_data
         )
         
-        return jsonify(analysis_result.model_dump())
+        response = model_response(analysis_result)
+        # A fallback summary must not outlive a transient OpenAI failure, so only real completions are cached
+        if ai_summary is None or ai_summary.get('ai_generated'):
+            result_cache.put(cache_key, response.get_data())
+        return response
         
-    except ValidationError as e:
-        return jsonify({'error': 'Invalid request data', 'details': e.errors()}), 400
     except Exception as e:
-        return jsonify({'error': f'Error analyzing logs: {str(e)}'}), 500
+        return json_response({'error': f'Error analyzing logs: {str(e)}'}), 500
 
 @analysis_bp.route('/anomalies', methods=['POST'])
 @require_auth
+@validate_body(AnomalyRequest)
 def get_anomalies():
     """Get detailed anomaly analysis for a specific log file"""
     try:
-        # Validate request data
-        request_data = request.get_json()
-        if not request_data:
-            return jsonify({'error': 'Request body is required'}), 400
+        validated_request = g.req_model
         
-        validated_request = AnomalyRequest(**request_data)
+        # Serve repeat requests for an unchanged file from the result cache
+        cache_key = result_cache.make_key(validated_request.file_path, 'anomalies')
+        cached_body = result_cache.get(cache_key)
+        if cached_body is not None:
+            return raw_json_response(cached_body)
         
         # Parse and analyze
-        parser = LogParser()
-        parsed_logs = parser.parse_file(validated_request.file_path)
+        parser = get_parser()
+        parsed_logs = parser.parse_file(validated_request.file_path, keep_raw=False)
         
-        detector = AnomalyDetector()
+        detector = get_detector()
         anomalies = detector.detect_anomalies(parsed_logs)
         
         # Group anomalies by type
@@ -168,101 +159,51 @@ def get_anomalies():
             grouped_anomalies[anomaly_type].append(anomaly)
         
         # Convert anomalies to Pydantic models
-        anomaly_responses = []
-        for anomaly in anomalies:
-            anomaly_responses.append(AnomalyResponse(
-                type=anomaly.get('type', 'unknown'),
-                severity=anomaly.get('severity', 'low'),
-                description=anomaly.get('description', ''),
-                timestamp=anomaly.get('timestamp'),
-                details=anomaly.get('details', {})
-            ))
+        anomaly_responses = _anomaly_responses(anomalies)
         
-        return jsonify({
-            'anomalies': [anomaly.model_dump() for anomaly in anomaly_responses],
+        response = json_response({
+            'anomalies': _ANOMALY_LIST_ADAPTER.dump_python(anomaly_responses),
             'grouped_anomalies': grouped_anomalies,
             'summary': {
                 'total_anomalies': len(anomalies),
                 'types': list(grouped_anomalies.keys())
             }
         })
+        result_cache.put(cache_key, response.get_data())
+        return response
         
-    except ValidationError as e:
-        return jsonify({'error': 'Invalid request data', 'details': e.errors()}), 400
     except Exception as e:
-        return jsonify({'error': f'Error getting anomalies: {str(e)}'}), 500
+        return json_response({'error': f'Error getting anomalies: {str(e)}'}), 500
 
 @analysis_bp.route('/timeline', methods=['POST'])
 @require_auth
+@validate_body(TimelineRequest)
 def get_timeline_data():
     """Get timeline data for visualization"""
     try:
-        # Validate request data
-        request_data = request.get_json()
-        if not request_data:
-            return jsonify({'error': 'Request body is required'}), 400
-        
-        validated_request = TimelineRequest(**request_data)
+        validated_request = g.req_model
         
-        parser = LogParser()
-        parsed_logs = parser.parse_file(validated_request.file_path)
+        # Serve repeat requests for an unchanged file from the result cache
+        cache_key = result_cache.make_key(validated_request.file_path, 'timeline')
+        cached_body = result_cache.get(cache_key)
+        if cached_body is not None:
+            return raw_json_response(cached_body)
         
-        # Group logs by time intervals
-        timeline_data = {}
-        from datetime import datetime
+        parser = get_parser()
         
-        for log in parsed_logs:
-            timestamp = log.get('timestamp')
-            if timestamp:
-                try:
-                    # Parse the timestamp to get the hour key
-                    if isinstance(timestamp, str):
-                        # Try to parse ISO format first
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            # Try common formats
-                            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
-                                try:
-                                    dt = datetime.strptime(timestamp, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                continue  # Skip if we can't parse the timestamp
-                        
-                        # Round to hour for grouping
-                        hour_key = dt.strftime('%Y-%m-%d %H:00:00')
-                        
-                        if hour_key not in timeline_data:
-                            timeline_data[hour_key] = {
-                                'total': 0,
-                                'errors': 0,
-                                'warnings': 0,
-                                'info': 0
-                            }
-                        
-                        timeline_data[hour_key]['total'] += 1
-                        level = log.get('level', 'INFO').upper()
-                        
-                        if level in ['ERROR', 'CRITICAL', 'FATAL']:
-                            timeline_data[hour_key]['errors'] += 1
-                        elif level in ['WARNING', 'WARN']:
-                            timeline_data[hour_key]['warnings'] += 1
-                        else:
-                            timeline_data[hour_key]['info'] += 1
-                            
-                except Exception as e:
-                    continue
+        # Group logs by time intervals, streaming entries so the file is never held in memory
+        timeline_data, level_totals = aggregate_levels(parser.iter_file(validated_request.file_path))
+        total_entries = sum(level_totals.values())
         
-        timeline_response = TimelineDataResponse(
+        # aggregate_levels only produces str -> {str: int} buckets, so the nested dicts need no validation
+        timeline_response = TimelineDataResponse.model_construct(
             timeline=timeline_data,
-            total_entries=len(parsed_logs)
+            total_entries=total_entries
         )
         
-        return jsonify(timeline_response.model_dump())
+        response = model_response(timeline_response)
+        result_cache.put(cache_key, response.get_data())
+        return response
         
-    except ValidationError as e:
-        return jsonify({'error': 'Invalid request data', 'details': e.errors()}), 400
     except Exception as e:
-        return jsonify({'error': f'Error getting timeline data: {str(e)}'}), 500
+        return json_response({'error': f'Error getting timeline data: {str(e)}'}), 500
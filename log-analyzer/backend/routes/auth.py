@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from utils.security import validate_jwt_token
+from utils.http import json_response, model_response
 from models.schemas import AuthResponse, UserResponse, ErrorResponse
 from functools import wraps
 from pydantic import ValidationError
@@ -15,7 +16,7 @@ def require_auth(f):
                 error='No authorization header',
                 details='Authorization header is required'
             )
-            return jsonify(error_response.model_dump()), 401
+            return model_response(error_response), 401
         
         token = auth_header.replace('Bearer ', '')
         try:
@@ -27,7 +28,7 @@ def require_auth(f):
                 error='Invalid token',
                 details=str(e)
             )
-            return jsonify(error_response.model_dump()), 401
+            return model_response(error_response), 401
     
     return decorated_function
 
@@ -40,7 +41,7 @@ def verify_token():
             error='No authorization header',
             details='Authorization header is required'
         )
-        return jsonify(error_response.model_dump()), 401
+        return model_response(error_response), 401
     
     token = auth_header.replace('Bearer ', '')
     try:
@@ -48,19 +49,19 @@ def verify_token():
         auth_response = AuthResponse(
             valid=True,
             user=UserResponse(
-                id=user.get('id', ''),
-                email=user.get('email', ''),
-                role=user.get('role', 'user'),
-                provider=user.get('provider', 'unknown')
+                id=user.id,
+                email=user.email,
+                role=user.role,
+                provider=user.provider
             )
         )
-        return jsonify(auth_response.model_dump())
+        return model_response(auth_response)
     except Exception as e:
         auth_response = AuthResponse(
             valid=False,
             error=str(e)
         )
-        return jsonify(auth_response.model_dump()), 401
+        return model_response(auth_response), 401
 
 @auth_bp.route('/user', methods=['GET'])
 @require_auth
@@ -68,15 +69,15 @@ def get_user_info():
     """Get current user information"""
     try:
         user_response = UserResponse(
-            id=request.user.get('id', ''),
-            email=request.user.get('email', ''),
-            role=request.user.get('role', 'user'),
-            provider=request.user.get('provider', 'unknown')
+            id=request.user.id,
+            email=request.user.email,
+            role=request.user.role,
+            provider=request.user.provider
         )
-        return jsonify({'user': user_response.model_dump()})
+        return json_response({'user': user_response.model_dump()})
     except ValidationError as e:
         error_response = ErrorResponse(
             error='Invalid user data',
             details=str(e.errors())
         )
-        return jsonify(error_response.model_dump()), 500
+        return model_response(error_response), 500
@@ -1,20 +1,51 @@
 import os
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, current_app
 from werkzeug.utils import secure_filename
-from services.parser import LogParser
+from services.parser import get_parser
 from utils.file_storage import save_file
+from utils.parse_jobs import get_job, submit_parse
 from routes.auth import require_auth
+from utils.http import model_response
+from utils.result_cache import result_cache
 from models.schemas import (
     FileInfoResponse, FileListResponse, UploadResponse, 
-    DeleteFileResponse, ErrorResponse
+    DeleteFileResponse, ErrorResponse, ParseJobResponse
 )
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
+from typing import Any, Dict, List
 
 upload_bp = Blueprint('upload', __name__)
 
+_FILE_INFO_LIST_ADAPTER = TypeAdapter(List[FileInfoResponse])
+
 def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+    # rpartition returns a fixed tuple instead of building a list like rsplit
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and extension.lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def _file_info_fields(file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a storage listing entry onto FileInfoResponse fields"""
+    return {
+        'filename': file_data['filename'],
+        'size': file_data['size'],
+        'uploaded_at': file_data['created_at'],
+        'path': file_data.get('path')
+    }
+
+def _file_info_responses(files_data: List[Dict[str, Any]]) -> List[FileInfoResponse]:
+    """Validate the whole listing in one call, falling back per entry to skip malformed ones"""
+    try:
+        return _FILE_INFO_LIST_ADAPTER.validate_python([_file_info_fields(d) for d in files_data])
+    except (KeyError, ValidationError):
+        pass
+    
+    files = []
+    for file_data in files_data:
+        try:
+            files.append(FileInfoResponse.model_validate(_file_info_fields(file_data)))
+        except (KeyError, ValidationError):
+            continue
+    return files
 
 @upload_bp.route('/file', methods=['POST'])
 @require_auth
@@ -25,7 +56,7 @@ def upload_file():
             error='No file part',
             details='File field is required in the request'
         )
-        return jsonify(error_response.model_dump()), 400
+        return model_response(error_response), 400
     
     file = request.files['file']
     if file.filename == '':
@@ -33,19 +64,29 @@ def upload_file():
             error='No selected file',
             details='Please select a file to upload'
         )
-        return jsonify(error_response.model_dump()), 400
+        return model_response(error_response), 400
     
     if file and allowed_file(file.filename):
         try:
             # Get user ID from authenticated request
-            user_id = request.user.get('id', 'anonymous')
+            user_id = request.user.id
             
             # Save file (will use Supabase if configured, otherwise local)
             filename = secure_filename(file.filename)
             file_path = save_file(file, filename, user_id)
             
+            # ?async=1 returns right after the save and parses in the background
+            if request.args.get('async', '').lower() in ('1', 'true'):
+                upload_response = UploadResponse(
+                    message='File uploaded, parsing in background',
+                    filename=filename,
+                    file_path=file_path,
+                    job_id=submit_parse(file_path, user_id)
+                )
+                return model_response(upload_response), 202
+            
             # Parse log file
-            parser = LogParser()
+            parser = get_parser()
             parse_result = parser.parse_file(file_path)
             
             upload_response = UploadResponse(
@@ -55,20 +96,41 @@ def upload_file():
                 parse_result=parse_result
             )
             
-            return jsonify(upload_response.model_dump())
+            return model_response(upload_response)
             
         except Exception as e:
             error_response = ErrorResponse(
                 error='Error processing file',
                 details=str(e)
             )
-            return jsonify(error_response.model_dump()), 500
+            return model_response(error_response), 500
     
     error_response = ErrorResponse(
         error='File type not allowed',
         details=f'Allowed types: {", ".join(current_app.config["ALLOWED_EXTENSIONS"])}'
     )
-    return jsonify(error_response.model_dump()), 400
+    return model_response(error_response), 400
+
+@upload_bp.route('/status/<job_id>', methods=['GET'])
+@require_auth
+def get_parse_status(job_id):
+    """Report the state of a background parse job"""
+    job = get_job(job_id)
+    if job is None or job.get('user_id') != request.user.id:
+        error_response = ErrorResponse(
+            error='Job not found',
+            details=f'No parse job with id {job_id}'
+        )
+        return model_response(error_response), 404
+    
+    status_response = ParseJobResponse(
+        job_id=job_id,
+        state=job['state'],
+        file_path=job['file_path'],
+        parse_result=job.get('result'),
+        error=job.get('error')
+    )
+    return model_response(status_response)
 
 @upload_bp.route('/files', methods=['GET'])
 @require_auth
@@ -76,35 +138,24 @@ def list_uploaded_files():
     """List all uploaded files for the user"""
     try:
         # Get user ID from authenticated request
-        user_id = request.user.get('id', 'anonymous')
+        user_id = request.user.id
         
         # Use file storage manager to list files
         from utils.file_storage import file_storage
         files_data = file_storage.list_files(user_id)
         
         # Convert to FileInfoResponse objects
-        files = []
-        for file_data in files_data:
-            try:
-                file_info = FileInfoResponse(
-                    filename=file_data['filename'],
-                    size=file_data['size'],
-                    uploaded_at=float(file_data['created_at']),  # Ensure it's a float
-                    path=file_data.get('path')
-                )
-                files.append(file_info)
-            except Exception as file_error:
-                continue
+        files = _file_info_responses(files_data)
         
         file_list_response = FileListResponse(files=files)
-        return jsonify(file_list_response.model_dump())
+        return model_response(file_list_response)
         
     except Exception as e:
         error_response = ErrorResponse(
             error='Error listing files',
             details=str(e)
         )
-        return jsonify(error_response.model_dump()), 500
+        return model_response(error_response), 500
 
 
 @upload_bp.route('/file/<filename>', methods=['DELETE'])
@@ -117,20 +168,21 @@ def delete_file(filename):
         
         if os.path.exists(file_path):
             os.remove(file_path)
+            result_cache.invalidate(file_path)
             delete_response = DeleteFileResponse(
                 message=f'File {filename} deleted successfully'
             )
-            return jsonify(delete_response.model_dump())
+            return model_response(delete_response)
         else:
             error_response = ErrorResponse(
                 error='File not found',
                 details=f'File {filename} does not exist'
             )
-            return jsonify(error_response.model_dump()), 404
+            return model_response(error_response), 404
             
     except Exception as e:
         error_response = ErrorResponse(
             error='Error deleting file',
             details=str(e)
         )
-        return jsonify(error_response.model_dump()), 500
+        return model_response(error_response), 500
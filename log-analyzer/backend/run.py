@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
 """
 Simple script to run the Flask backend server
+
+Pass --production to serve through Gunicorn (see gunicorn.conf.py)
+instead of the single-process development server.
 """
 import os
 import sys
 from app import create_app
 
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_production():
+    """Serve the app with threaded Gunicorn workers"""
+    from gunicorn.app.wsgiapp import WSGIApplication
+    
+    sys.argv = [
+        'gunicorn',
+        '--config', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+        '--chdir', BACKEND_DIR,
+        'app:create_app()'
+    ]
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
 if __name__ == '__main__':
+    if '--production' in sys.argv[1:]:
+        run_production()
+        sys.exit(0)
+    
     # Set environment variables
     os.environ['FLASK_ENV'] = 'development'
     os.environ['DEBUG'] = 'true'
@@ -0,0 +1,46 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+from datetime import datetime
+from services.levels import LEVEL_CATEGORY
+
+_HOUR_KEY_SUFFIX = ':00:00'
+
+def hour_key(timestamp: str) -> Optional[str]:
+    """Bucket a timestamp by hour as 'YYYY-MM-DD HH:00:00', or None if unparseable"""
+    # Fast path: 'YYYY-MM-DD[T ]HH...' only needs slicing
+    if (len(timestamp) >= 13 and timestamp[4] == '-' and timestamp[7] == '-' and timestamp[10] in 'T '
+            and timestamp[:4].isdigit() and timestamp[5:7].isdigit()
+            and timestamp[8:10].isdigit() and timestamp[11:13].isdigit()):
+        return timestamp[:10] + ' ' + timestamp[11:13] + _HOUR_KEY_SUFFIX
+    
+    # Anything else goes through the full ISO parser
+    try:
+        dt = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    return dt.strftime('%Y-%m-%d %H:00:00')
+
+def aggregate_levels(logs: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int]]:
+    """Count entries per hour and level category in one pass, returning (timeline, level_totals)"""
+    timeline = {}
+    level_totals = {'errors': 0, 'warnings': 0, 'info': 0}
+    
+    for log in logs:
+        level = log.get('level', 'INFO')
+        category = LEVEL_CATEGORY.get(level.upper(), 'info') if isinstance(level, str) else 'info'
+        level_totals[category] += 1
+        
+        timestamp = log.get('timestamp')
+        if not timestamp or not isinstance(timestamp, str):
+            continue
+        
+        key = hour_key(timestamp)
+        if key is None:
+            continue  # Skip unparseable timestamps
+        
+        stats = timeline.get(key)
+        if stats is None:
+            stats = timeline[key] = {'total': 0, 'errors': 0, 'warnings': 0, 'info': 0}
+        stats['total'] += 1
+        stats[category] += 1
+    
+    return timeline, level_totals
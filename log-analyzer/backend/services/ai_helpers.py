@@ -1,7 +1,45 @@
 import os
-from typing import List, Dict, Any, Optional
+import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 import json
-import openai
+from openai import OpenAI
+
+_SUMMARY_CACHE_SIZE = 1024
+
+_INSIGHT_KEYWORDS = (
+    ('error', "System errors detected"),
+    ('performance', "Performance issues identified"),
+    ('security', "Security concerns raised"),
+    ('anomaly', "Unusual patterns detected"),
+    ('network', "Network activity patterns identified"),
+    ('access', "Access patterns analyzed"),
+)
+
+_RECOMMENDATION_KEYWORDS = (
+    ('investigate', "Investigate detected anomalies"),
+    ('monitor', "Monitor system performance"),
+    ('review', "Review system logs regularly"),
+    ('update', "Consider system updates"),
+    ('security', "Review security configurations"),
+    ('backup', "Verify backup systems"),
+)
+
+def _keyword_scanner(keywords: Tuple[Tuple[str, str], ...]):
+    """Compile keywords into one lookahead alternation so overlapping hits (e.g. 'backupdate') are all seen"""
+    return re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword, _ in keywords) + '))')
+
+_INSIGHT_SCANNER = _keyword_scanner(_INSIGHT_KEYWORDS)
+_RECOMMENDATION_SCANNER = _keyword_scanner(_RECOMMENDATION_KEYWORDS)
+
+def _match_keywords(text: str, scanner, keywords: Tuple[Tuple[str, str], ...]) -> List[str]:
+    """Scan text once and return the labels of the keywords it contains, in keyword order"""
+    found = {match.group(1) for match in scanner.finditer(text.lower())}
+    return [label for keyword, label in keywords if keyword in found]
 
 class AIHelper:
     """AI/LLM helper for generating log summaries and insights"""
@@ -9,11 +47,13 @@ class AIHelper:
     def __init__(self):
         self.openai_api_key = os.environ.get('OPENAI_API_KEY')
         self.enabled = bool(self.openai_api_key)
-        
-        if self.enabled:
-            openai.api_key = self.openai_api_key
-        else:
-            pass
+        # One client per helper keeps its HTTPS connection pool warm between summaries; no retries, since a
+        # failed summary falls back and isn't cached, so the next request tries again anyway
+        self.client = OpenAI(api_key=self.openai_api_key, max_retries=0) if self.enabled else None
+        self._summary_cache: OrderedDict = OrderedDict()
+        self._summary_cache_lock = threading.Lock()
+        # Bounds concurrent OpenAI requests per process
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ai-summary')
     
     def generate_summary(self, logs: List[Dict[str, Any]], anomalies: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """Generate AI-powered summary of log analysis"""
@@ -24,41 +64,39 @@ class AIHelper:
             # Prepare context for AI
             context = self._prepare_context(logs, anomalies)
             
-            # Generate summary using OpenAI
+            # Generate summary using OpenAI, falling back to the templated findings if the request fails
             summary = self._call_openai_api(context)
+            ai_generated = summary is not None
+            if not ai_generated:
+                summary = self._fallback_summary_text(context)
             
             return {
                 'summary': summary,
                 'insights': self._extract_insights(summary),
-                'recommendations': self._extract_recommendations(summary)
+                'recommendations': self._extract_recommendations(summary),
+                # Lets callers avoid caching anything built from a fallback
+                'ai_generated': ai_generated
             }
             
         except Exception as e:
             # Fallback to basic summary if AI fails
             return self._generate_basic_summary(logs, anomalies)
     
+    def generate_summary_async(self, logs: List[Dict[str, Any]], anomalies: List[Dict[str, Any]]) -> Future:
+        """Run generate_summary on a background thread so callers can overlap other work with the API call"""
+        return self._executor.submit(self.generate_summary, logs, anomalies)
+    
     def _prepare_context(self, logs: List[Dict[str, Any]], anomalies: List[Dict[str, Any]]) -> str:
         """Prepare context for AI analysis"""
-        # Count log levels
-        level_counts = {}
-        for log in logs:
-            level = log.get('level', 'UNKNOWN')
-            level_counts[level] = level_counts.get(level, 0) + 1
-        
-        # Count anomalies by type
-        anomaly_counts = {}
-        for anomaly in anomalies:
-            anomaly_type = anomaly.get('type', 'unknown')
-            anomaly_counts[anomaly_type] = anomaly_counts.get(anomaly_type, 0) + 1
+        # Count log levels and anomaly types with Counter's C counting loop
+        level_counts = Counter(log.get('level', 'UNKNOWN') for log in logs)
+        anomaly_counts = Counter(anomaly.get('type', 'unknown') for anomaly in anomalies)
         
-        # Get sample log messages for context
-        sample_messages = []
-        for log in logs[:10]:  # First 10 logs
-            if log.get('message'):
-                sample_messages.append(log.get('message')[:100])  # First 100 chars
+        # Get sample log messages for context (first 100 chars of the first 10 logs)
+        sample_messages = [log['message'][:100] for log in logs[:10] if log.get('message')]
         
         # Create context string
-        context = f"""
+        parts = [f"""
         Log Analysis Summary:
         - Total log entries: {len(logs)}
         - Log levels: {json.dumps(level_counts)}
@@ -66,25 +104,32 @@ class AIHelper:
         - Anomaly types: {json.dumps(anomaly_counts)}
         
         Top anomalies:
-        """
+        """]
         
         for i, anomaly in enumerate(anomalies[:5]):
-            context += f"\n{i+1}. {anomaly.get('description', 'Unknown')} (Severity: {anomaly.get('severity', 'unknown')})"
+            parts.append(f"\n{i+1}. {anomaly.get('description', 'Unknown')} (Severity: {anomaly.get('severity', 'unknown')})")
         
         if sample_messages:
-            context += f"\n\nSample log messages:\n"
+            parts.append("\n\nSample log messages:\n")
             for i, msg in enumerate(sample_messages[:5]):
-                context += f"{i+1}. {msg}\n"
+                parts.append(f"{i+1}. {msg}\n")
         
-        return context
+        return ''.join(parts)
     
-    def _call_openai_api(self, context: str) -> str:
-        """Call OpenAI API for summary generation"""
+    def _call_openai_api(self, context: str) -> Optional[str]:
+        """Call OpenAI API for summary generation, or None if the request failed"""
         if not self.openai_api_key:
             return "AI analysis not available - no API key configured"
         
+        key = hashlib.blake2b(context.encode(), digest_size=16).hexdigest()
+        with self._summary_cache_lock:
+            cached = self._summary_cache.get(key)
+            if cached is not None:
+                self._summary_cache.move_to_end(key)
+                return cached
+        
         try:
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -98,14 +143,25 @@ class AIHelper:
                 ],
                 max_tokens=500,
                 temperature=0.3,
-                request_timeout=120.0  # 2 minute timeout
+                timeout=120.0  # 2 minute timeout
             )
             
-            return response.choices[0].message.content.strip()
+            summary = response.choices[0].message.content.strip()
+            
+            # Only real completions are cached so a transient failure is retried next time
+            with self._summary_cache_lock:
+                self._summary_cache[key] = summary
+                if len(self._summary_cache) > _SUMMARY_CACHE_SIZE:
+                    self._summary_cache.popitem(last=False)
+            
+            return summary
             
         except Exception as e:
-            # Fallback to basic summary
-            return f"""
+            return None
+    
+    def _fallback_summary_text(self, context: str) -> str:
+        """Templated summary used when the OpenAI request fails"""
+        return f"""
             Based on the log analysis, here are the key findings:
             
             {context}
@@ -117,40 +173,14 @@ class AIHelper:
     def _extract_insights(self, summary: str) -> List[str]:
         """Extract key insights from AI summary"""
         # Simple keyword-based insight extraction
-        insights = []
-        
-        if 'error' in summary.lower():
-            insights.append("System errors detected")
-        if 'performance' in summary.lower():
-            insights.append("Performance issues identified")
-        if 'security' in summary.lower():
-            insights.append("Security concerns raised")
-        if 'anomaly' in summary.lower():
-            insights.append("Unusual patterns detected")
-        if 'network' in summary.lower():
-            insights.append("Network activity patterns identified")
-        if 'access' in summary.lower():
-            insights.append("Access patterns analyzed")
+        insights = _match_keywords(summary, _INSIGHT_SCANNER, _INSIGHT_KEYWORDS)
         
         return insights if insights else ["No specific insights available"]
     
     def _extract_recommendations(self, summary: str) -> List[str]:
         """Extract recommendations from AI summary"""
         # Simple keyword-based recommendation extraction
-        recommendations = []
-        
-        if 'investigate' in summary.lower():
-            recommendations.append("Investigate detected anomalies")
-        if 'monitor' in summary.lower():
-            recommendations.append("Monitor system performance")
-        if 'review' in summary.lower():
-            recommendations.append("Review system logs regularly")
-        if 'update' in summary.lower():
-            recommendations.append("Consider system updates")
-        if 'security' in summary.lower():
-            recommendations.append("Review security configurations")
-        if 'backup' in summary.lower():
-            recommendations.append("Verify backup systems")
+        recommendations = _match_keywords(summary, _RECOMMENDATION_SCANNER, _RECOMMENDATION_KEYWORDS)
         
         return recommendations if recommendations else ["Continue monitoring system health"]
     
@@ -178,7 +208,8 @@ class AIHelper:
                 "Review high-severity anomalies first",
                 "Monitor error rates over time",
                 "Check system performance metrics"
-            ]
+            ],
+            'ai_generated': False
         }
     
     def analyze_log_patterns(self, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -235,3 +266,8 @@ class AIHelper:
                 suggestions.append("High number of unique IPs - consider rate limiting")
         
         return suggestions if suggestions else ["System appears to be operating normally"]
+
+@lru_cache(maxsize=1)
+def get_ai_helper() -> AIHelper:
+    """Return a shared AIHelper, built once per process"""
+    return AIHelper()
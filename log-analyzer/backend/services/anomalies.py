@@ -1,7 +1,117 @@
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict, Counter
-import statistics
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+import math
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from services.levels import ERROR_LEVELS
+
+# Prefixes stripped from error messages so repeats are compared on their text alone
+_TS_PREFIX_RE = re.compile(r'^\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}\s*')
+_LEVEL_PREFIX_RE = re.compile(r'^(ERROR|CRITICAL|FATAL)\s*', re.IGNORECASE)
+
+_FALLBACK_TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+# Assuming 9 AM - 6 PM
+_BUSINESS_START, _BUSINESS_END = 9, 18
+# Business hours as an immutable template; each anomaly gets its own list copy
+_BUSINESS_HOURS = tuple(range(_BUSINESS_START, _BUSINESS_END))
+
+# Busy logs repeat the same second-resolution timestamp many times, so parses are memoized per string
+@lru_cache(maxsize=1 << 16)
+def _parse_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parse a log timestamp as ISO first, then the common fallbacks, or None if unparseable"""
+    try:
+        dt = datetime.fromisoformat(timestamp)
+    except ValueError:
+        pass
+    else:
+        # Zoned and plain timestamps can share a file; compare them all as naive UTC
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
+    for fmt in _FALLBACK_TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(timestamp, fmt)
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=1 << 16)
+def _hour_key(timestamp: str) -> Optional[datetime]:
+    """Truncate a log timestamp to its hour, or None if unparseable"""
+    dt = _parse_timestamp(timestamp)
+    return dt.replace(minute=0, second=0, microsecond=0) if dt else None
+
+@lru_cache(maxsize=1 << 16)
+def _minute_key(timestamp: str) -> Optional[datetime]:
+    """Truncate a log timestamp to its minute, or None if unparseable"""
+    dt = _parse_timestamp(timestamp)
+    return dt.replace(second=0, microsecond=0) if dt is not None else None
+
+def _mean_stdev(values: List[float]) -> Tuple[float, float]:
+    """Sample mean and standard deviation, using fsum and integer sums rather than statistics' exact fractions"""
+    n = len(values)
+    if min(values) == max(values):
+        return values[0], 0.0
+    if all(type(value) is int for value in values):
+        # Integer counts: sums are exact and int / int rounds once, as statistics does
+        total = sum(values)
+        mean = total // n if total % n == 0 else total / n
+        variance = (n * sum(value * value for value in values) - total * total) / (n * (n - 1))
+    else:
+        mean = math.fsum(values) / n
+        variance = math.fsum((value - mean) ** 2 for value in values) / (n - 1)
+    return mean, math.sqrt(variance)
+
+def _is_error(log: Dict[str, Any]) -> bool:
+    level = log.get('level')
+    return isinstance(level, str) and level.upper() in ERROR_LEVELS
+
+@dataclass(slots=True)
+class _LogAggregates:
+    """Per-log counters shared by the default detectors, built in one pass"""
+    hourly_total: Dict[datetime, int] = field(default_factory=lambda: defaultdict(int))
+    hourly_errors: Dict[datetime, int] = field(default_factory=lambda: defaultdict(int))
+    # (original timestamp, hour) for each error logged outside business hours, in log order
+    off_hours_errors: List[Tuple[str, int]] = field(default_factory=list)
+    # ip -> [requests, requests with status >= 400]
+    ip_activity: Dict[str, List[int]] = field(default_factory=dict)
+    status_counts: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+def _aggregate(logs: List[Dict[str, Any]]) -> _LogAggregates:
+    """Parse each timestamp once and collect everything the default detectors need"""
+    agg = _LogAggregates()
+    hourly_total = agg.hourly_total
+    hourly_errors = agg.hourly_errors
+    
+    for log in logs:
+        timestamp = log.get('timestamp')
+        if timestamp and isinstance(timestamp, str):
+            hour_key = _hour_key(timestamp)
+            if hour_key is not None:
+                hourly_total[hour_key] += 1
+                if _is_error(log):
+                    hourly_errors[hour_key] += 1
+                    if not _BUSINESS_START <= hour_key.hour < _BUSINESS_END:
+                        agg.off_hours_errors.append((timestamp, hour_key.hour))
+        
+        if log.get('format') == 'apache':
+            ip = log.get('ip_address')
+            if ip:
+                activity = agg.ip_activity.get(ip)
+                if activity is None:
+                    activity = agg.ip_activity[ip] = [0, 0]
+                activity[0] += 1
+                if (log.get('status_code') or 0) >= 400:
+                    activity[1] += 1
+            
+            status = log.get('status_code')
+            if status:
+                agg.status_counts[status] += 1
+    
+    return agg
 
 class AnomalyDetector:
     """Detect anomalies in log data using various algorithms"""
@@ -21,54 +131,30 @@ class AnomalyDetector:
         if not logs:
             return []
         
+        # One pass over the logs feeds every detector below
+        agg = _aggregate(logs)
+        
         anomalies = []
         
         # Only run the most important and fast anomaly detections
         
         # Skip time-intensive anomaly detections for speed
-        anomalies.extend(self._detect_error_spikes(logs))
-        anomalies.extend(self._detect_time_anomalies(logs))
-        anomalies.extend(self._detect_ip_anomalies(logs))
-        anomalies.extend(self._detect_status_anomalies(logs))
+        anomalies.extend(self._detect_error_spikes(logs, agg))
+        anomalies.extend(self._detect_time_anomalies(logs, agg))
+        anomalies.extend(self._detect_ip_anomalies(logs, agg))
+        anomalies.extend(self._detect_status_anomalies(logs, agg))
         
         return anomalies
     
-    def _detect_error_spikes(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_error_spikes(self, logs: List[Dict[str, Any]], agg: Optional[_LogAggregates] = None) -> List[Dict[str, Any]]:
         """Detect sudden spikes in error rates"""
         anomalies = []
         
-        # Group logs by time intervals (hourly)
-        hourly_errors = defaultdict(int)
-        hourly_total = defaultdict(int)
-        
-        for log in logs:
-            timestamp = log.get('timestamp')
-            if timestamp:
-                try:
-                    # Parse timestamp and round to hour
-                    if isinstance(timestamp, str):
-                        # Try to parse ISO format first
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            # Try common formats
-                            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
-                                try:
-                                    dt = datetime.strptime(timestamp, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                continue  # Skip if we can't parse the timestamp
-                        
-                        hour_key = dt.replace(minute=0, second=0, microsecond=0)
-                        
-                        hourly_total[hour_key] += 1
-                        if log.get('level', '').upper() in ['ERROR', 'CRITICAL', 'FATAL']:
-                            hourly_errors[hour_key] += 1
-                        
-                except (ValueError, TypeError):
-                    continue
+        # Logs grouped by hour
+        if agg is None:
+            agg = _aggregate(logs)
+        hourly_errors = agg.hourly_errors
+        hourly_total = agg.hourly_total
         
         # Calculate error rates and detect spikes
         error_rates = []
@@ -79,8 +165,7 @@ class AnomalyDetector:
         
         if len(error_rates) > 1:
             rates = [rate for _, rate in error_rates]
-            mean_rate = statistics.mean(rates)
-            std_rate = statistics.stdev(rates) if len(rates) > 1 else 0
+            mean_rate, std_rate = _mean_stdev(rates)
             
             for hour, rate in error_rates:
                 if std_rate > 0 and abs(rate - mean_rate) > 2 * std_rate:
@@ -105,14 +190,13 @@ class AnomalyDetector:
         # Look for repeated error messages (extract meaningful part after timestamp and level)
         error_messages = []
         for log in logs:
-            if log.get('level', '').upper() in ['ERROR', 'CRITICAL', 'FATAL']:
+            if _is_error(log):
                 message = log.get('message', '')
                 # Try to extract meaningful part (remove timestamp and level prefix if present)
                 # Look for patterns like "ERROR Some message" or "2024-01-01 ERROR Some message"
-                import re
                 # Remove timestamp and level prefixes to focus on the actual error message
-                cleaned_message = re.sub(r'^\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}\s*', '', message)
-                cleaned_message = re.sub(r'^(ERROR|CRITICAL|FATAL)\s*', '', cleaned_message, flags=re.IGNORECASE)
+                cleaned_message = _TS_PREFIX_RE.sub('', message)
+                cleaned_message = _LEVEL_PREFIX_RE.sub('', cleaned_message)
                 
                 if cleaned_message.strip():
                     error_messages.append(cleaned_message.strip())
@@ -122,18 +206,23 @@ class AnomalyDetector:
         # Flag messages that appear too frequently
         total_errors = len(error_messages)
         if total_errors >= 3:  # Need at least 3 errors to detect patterns
-            for message, count in message_counts.most_common(5):
-                if count >= 3 and count > total_errors * 0.3:  # At least 3 occurrences and more than 30% of errors
-                    anomalies.append({
-                        'type': 'unusual_pattern',
-                        'severity': 'medium',
-                        'description': f'Repeated error pattern: "{message[:100]}{'...' if len(message) > 100 else ''}"',
-                        'details': {
-                            'message': message,
-                            'count': count,
-                            'percentage': count / total_errors
-                        }
-                    })
+            # At least 3 occurrences and more than 30% of errors; at most three messages can pass, so
+            # filtering first and sorting the survivors matches most_common(5) without ranking every message
+            threshold = total_errors * 0.3
+            frequent = [(message, count) for message, count in message_counts.items() if count >= 3 and count > threshold]
+            frequent.sort(key=lambda item: item[1], reverse=True)
+            for message, count in frequent:
+                ellipsis = '...' if len(message) > 100 else ''
+                anomalies.append({
+                    'type': 'unusual_pattern',
+                    'severity': 'medium',
+                    'description': f'Repeated error pattern: "{message[:100]}{ellipsis}"',
+                    'details': {
+                        'message': message,
+                        'count': count,
+                        'percentage': count / total_errors
+                    }
+                })
         
         return anomalies
     
@@ -146,32 +235,14 @@ class AnomalyDetector:
         
         for log in logs:
             timestamp = log.get('timestamp')
-            if timestamp:
-                try:
-                    if isinstance(timestamp, str):
-                        # Try to parse ISO format first
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            # Try common formats
-                            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
-                                try:
-                                    dt = datetime.strptime(timestamp, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                continue  # Skip if we can't parse the timestamp
-                        
-                        minute_key = dt.replace(second=0, microsecond=0)
-                        minute_counts[minute_key] += 1
-                except (ValueError, TypeError):
-                    continue
+            if timestamp and isinstance(timestamp, str):
+                minute_key = _minute_key(timestamp)
+                if minute_key is not None:
+                    minute_counts[minute_key] += 1
         
         if minute_counts:
             counts = list(minute_counts.values())
-            mean_count = statistics.mean(counts)
-            std_count = statistics.stdev(counts) if len(counts) > 1 else 0
+            mean_count, std_count = _mean_stdev(counts)
             
             for minute, count in minute_counts.items():
                 if std_count > 0 and count > mean_count + 2 * std_count:
@@ -189,68 +260,38 @@ class AnomalyDetector:
         
         return anomalies
     
-    def _detect_time_anomalies(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_time_anomalies(self, logs: List[Dict[str, Any]], agg: Optional[_LogAggregates] = None) -> List[Dict[str, Any]]:
         """Detect logs outside normal time patterns"""
-        anomalies = []
+        if agg is None:
+            agg = _aggregate(logs)
         
-        # Check for logs outside business hours (assuming 9 AM - 6 PM)
-        business_hours = range(9, 18)
-        
-        for log in logs:
-            timestamp = log.get('timestamp')
-            if timestamp:
-                try:
-                    if isinstance(timestamp, str):
-                        # Try to parse ISO format first
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            # Try common formats
-                            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
-                                try:
-                                    dt = datetime.strptime(timestamp, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                continue  # Skip if we can't parse the timestamp
-                        
-                        hour = dt.hour
-                        
-                        if hour not in business_hours and log.get('level', '').upper() in ['ERROR', 'CRITICAL', 'FATAL']:
-                            anomalies.append({
-                                'type': 'time_anomaly',
-                                'severity': 'low',
-                                'timestamp': timestamp,
-                                'description': f'Error outside business hours: {hour:02d}:00',
-                                'details': {
-                                    'hour': hour,
-                                    'business_hours': list(business_hours)
-                                }
-                            })
-                except (ValueError, TypeError):
-                    continue
-        
-        return anomalies
+        # Errors logged outside business hours
+        return [
+            {
+                'type': 'time_anomaly',
+                'severity': 'low',
+                'timestamp': timestamp,
+                'description': f'Error outside business hours: {hour:02d}:00',
+                'details': {
+                    'hour': hour,
+                    'business_hours': list(_BUSINESS_HOURS)
+                }
+            }
+            for timestamp, hour in agg.off_hours_errors
+        ]
     
-    def _detect_ip_anomalies(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_ip_anomalies(self, logs: List[Dict[str, Any]], agg: Optional[_LogAggregates] = None) -> List[Dict[str, Any]]:
         """Detect suspicious IP activity"""
         anomalies = []
         
-        # Group by IP address
-        ip_activity = defaultdict(list)
-        
-        for log in logs:
-            if log.get('format') == 'apache':
-                ip = log.get('ip_address')
-                if ip:
-                    ip_activity[ip].append(log)
+        # Requests and error responses per IP address
+        if agg is None:
+            agg = _aggregate(logs)
         
         # Check for IPs with unusual activity patterns
-        for ip, ip_logs in ip_activity.items():
-            if len(ip_logs) > 100:  # High volume from single IP
-                error_count = len([log for log in ip_logs if log.get('status_code', 0) >= 400])
-                error_rate = error_count / len(ip_logs)
+        for ip, (total_requests, error_count) in agg.ip_activity.items():
+            if total_requests > 100:  # High volume from single IP
+                error_rate = error_count / total_requests
                 
                 if error_rate > 0.5:  # More than 50% errors
                     anomalies.append({
@@ -259,7 +300,7 @@ class AnomalyDetector:
                         'description': f'Suspicious IP activity: {ip}',
                         'details': {
                             'ip_address': ip,
-                            'total_requests': len(ip_logs),
+                            'total_requests': total_requests,
                             'error_rate': error_rate,
                             'error_count': error_count
                         }
@@ -267,18 +308,14 @@ class AnomalyDetector:
         
         return anomalies
     
-    def _detect_status_anomalies(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_status_anomalies(self, logs: List[Dict[str, Any]], agg: Optional[_LogAggregates] = None) -> List[Dict[str, Any]]:
         """Detect unusual HTTP status codes"""
         anomalies = []
         
-        # Group by status code
-        status_counts = defaultdict(int)
-        
-        for log in logs:
-            if log.get('format') == 'apache':
-                status = log.get('status_code')
-                if status:
-                    status_counts[status] += 1
+        # Requests per status code
+        if agg is None:
+            agg = _aggregate(logs)
+        status_counts = agg.status_counts
         
         # Check for unusual status code patterns
         total_requests = sum(status_counts.values())
@@ -301,3 +338,8 @@ class AnomalyDetector:
                     })
         
         return anomalies
+
+@lru_cache(maxsize=1)
+def get_detector() -> AnomalyDetector:
+    """Return a shared AnomalyDetector; detection keeps no per-call state, so it is safe across threads"""
+    return AnomalyDetector()
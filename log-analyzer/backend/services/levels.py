@@ -0,0 +1,10 @@
+"""Shared log level groupings used when classifying parsed entries"""
+
+ERROR_LEVELS = frozenset(('ERROR', 'CRITICAL', 'FATAL'))
+WARN_LEVELS = frozenset(('WARNING', 'WARN'))
+
+# Maps an upper-cased level to its timeline/statistics bucket; anything else counts as 'info'
+LEVEL_CATEGORY = {
+    **dict.fromkeys(ERROR_LEVELS, 'errors'),
+    **dict.fromkeys(WARN_LEVELS, 'warnings'),
+}
@@ -1,7 +1,97 @@
+import io
 import re
 import json
-from datetime import datetime
-from typing import List, Dict, Any
+import random
+import orjson
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+# Common timestamp formats with year
+_APACHE_ACCESS_FORMATS = (
+    '%d/%b/%Y:%H:%M:%S %z',  # Apache access logs with timezone
+    '%d/%b/%Y:%H:%M:%S',     # Apache access logs without timezone
+)
+_APACHE_ERROR_FORMATS = (
+    '%a %b %d %H:%M:%S %Y',  # Apache error logs: Thu Jun 09 06:07:04 2005
+)
+_ISO_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',     # ISO format
+    '%Y-%m-%dT%H:%M:%S',     # ISO format with T
+    '%Y-%m-%dT%H:%M:%S.%fZ'  # ISO format with microseconds
+)
+_FORMATS_WITH_YEAR = _APACHE_ACCESS_FORMATS + _APACHE_ERROR_FORMATS + _ISO_FORMATS
+_ISO_SPACE_FORMATS, _ISO_T_FORMATS, _ISO_FRACTION_FORMATS = ((fmt,) for fmt in _ISO_FORMATS)
+
+# Formats without year - parsed values get the current year
+_FORMATS_WITHOUT_YEAR = (
+    '%b %d %H:%M:%S',        # Syslog format: Jun 09 06:07:04
+    '%a %b %d %H:%M:%S',     # Apache error without year: Thu Jun 09 06:07:04
+)
+_SYSLOG_FORMATS, _WEEKDAY_FORMATS_WITHOUT_YEAR = ((fmt,) for fmt in _FORMATS_WITHOUT_YEAR)
+
+# Canonical Apache access timestamp, e.g. 10/Oct/2000:13:55:36 -0700
+_APACHE_ACCESS_TS_RE = re.compile(r'(\d\d)/([A-Za-z]{3})/(\d{4}):(\d\d):(\d\d):(\d\d)(?: ([+-])(\d\d)([0-5]\d))?', re.ASCII)
+_MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+_UTC_OFFSETS: Dict[str, timezone] = {}
+
+def _parse_apache_access_timestamp(timestamp_str: str) -> Optional[datetime]:
+    """Parse the canonical access-log layout without strptime, or None to fall back to it"""
+    match = _APACHE_ACCESS_TS_RE.fullmatch(timestamp_str)
+    if match is None:
+        return None
+    day, month_name, year, hour, minute, second, sign, offset_hours, offset_minutes = match.groups()
+    month = _MONTHS.get(month_name.lower())
+    if month is None:
+        return None
+    try:
+        tzinfo = None
+        if sign:
+            offset = sign + offset_hours + offset_minutes
+            tzinfo = _UTC_OFFSETS.get(offset)
+            if tzinfo is None:
+                delta = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+                tzinfo = _UTC_OFFSETS[offset] = timezone(-delta if sign == '-' else delta)
+        return datetime(int(year), month, int(day), int(hour), int(minute), int(second), tzinfo=tzinfo)
+    except ValueError:
+        # Out-of-range fields; let strptime decide as before
+        return None
+
+def _loads_json_line(line: str) -> Any:
+    """Decode a JSON log line with orjson, deferring to json for what orjson rejects (NaN, lone surrogates)"""
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return json.loads(line)
+
+def _candidate_timestamp_formats(timestamp_str: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Pick the strptime formats worth trying from the string's leading characters"""
+    first = timestamp_str[:1]
+    if first.isalpha():
+        # Weekday/month names: Apache error or syslog. After the three-letter name, a letter
+        # means a weekday form and a digit means syslog; anything else could still be either
+        if timestamp_str[3:4] == ' ':
+            after_name = timestamp_str[4:5]
+            if after_name.isalpha():
+                return _APACHE_ERROR_FORMATS, _WEEKDAY_FORMATS_WITHOUT_YEAR
+            if after_name.isdigit():
+                return (), _SYSLOG_FORMATS
+        return _APACHE_ERROR_FORMATS, _FORMATS_WITHOUT_YEAR
+    if first.isdigit():
+        if timestamp_str[4:5] == '-':
+            # Zero-padded dates put the date/time separator at index 10
+            separator = timestamp_str[10:11]
+            if separator == ' ':
+                return _ISO_SPACE_FORMATS, ()
+            if separator in ('T', 't'):
+                # strptime matches format literals case-insensitively
+                return (_ISO_FRACTION_FORMATS if timestamp_str[-1] in 'Zz' else _ISO_T_FORMATS), ()
+            return _ISO_FORMATS, ()
+        if '/' in timestamp_str[1:3]:
+            return _APACHE_ACCESS_FORMATS, ()
+    # Unknown shape: fall back to every format
+    return _FORMATS_WITH_YEAR, _FORMATS_WITHOUT_YEAR
 
 class LogParser:
     """Parse various log formats into structured JSON"""
@@ -14,15 +104,20 @@ class LogParser:
             'nginx': re.compile(r'^(\S+) - - \[([^\]]+)\] "([^"]*)" (\d+) (\d+|-)'),
             'syslog': re.compile(r'^(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s+([^:]+):\s*(.*)'),
             'json': re.compile(r'^\{.*\}$'),
-            'timestamp': re.compile(r'^(\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2})'),
-            'level': re.compile(r'(ERROR|WARN|WARNING|INFO|DEBUG|CRITICAL|FATAL)', re.IGNORECASE)
+            # Fractional seconds and a UTC designator or offset are kept as part of an ISO timestamp
+            'timestamp': re.compile(r'^(\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)'),
+            # WARNING must come before WARN, or alternation stops at the shorter prefix
+            'level': re.compile(r'(ERROR|WARNING|WARN|INFO|DEBUG|CRITICAL|FATAL)', re.IGNORECASE)
         }
     
-    def parse_file(self, file_path: str, max_lines: int = 10000, sample_rate: float = 1.0) -> List[Dict[str, Any]]:
+    def parse_file(self, file_path: str, max_lines: int = 10000, sample_rate: float = 1.0,
+                   keep_raw: bool = True) -> List[Dict[str, Any]]:
         """Parse a log file and return structured data with optional sampling for performance"""
-        parsed_logs = []
-        lines_processed = 0
-        
+        return list(self.iter_file(file_path, max_lines, sample_rate, keep_raw))
+    
+    def iter_file(self, file_path: str, max_lines: int = 10000, sample_rate: float = 1.0,
+                  keep_raw: bool = True) -> Iterator[Dict[str, Any]]:
+        """Parse a log file lazily, yielding one structured entry at a time; keep_raw=False drops 'raw_line'"""
         try:
             # Check if this is a Supabase storage path
             if file_path.startswith('supabase://'):
@@ -32,74 +127,73 @@ class LogParser:
                 if file_content is None:
                     raise Exception(f"Could not retrieve file from Supabase storage: {file_path}")
                 
-                # Parse content as text
-                lines = file_content.decode('utf-8', errors='ignore').split('\n')
-                total_lines = len(lines)
-                
-                # Apply sampling for large files only if sample_rate < 1.0
-                if sample_rate < 1.0 and total_lines > max_lines:
-                    import random
-                    # Sample lines randomly
-                    sampled_indices = sorted(random.sample(range(total_lines), int(total_lines * sample_rate)))
-                    lines = [lines[i] for i in sampled_indices]
+                # Apply sampling for large files only
+                if sample_rate < 1.0 and file_content.count(b'\n') + 1 <= max_lines:
+                    sample_rate = 1.0
                 
-                for line_num, line in enumerate(lines, 1):
-                    if lines_processed >= max_lines:
-                        break
-                        
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    parsed_entry = self.parse_line(line, line_num)
-                    if parsed_entry:
-                        parsed_logs.append(parsed_entry)
-                        lines_processed += 1
+                # Decode lines as they are read rather than splitting the whole text into a list;
+                # newline='\n' splits on '\n' only, as str.split('\n') did
+                lines = io.TextIOWrapper(io.BytesIO(file_content), encoding='utf-8', errors='ignore', newline='\n')
+                yield from self._iter_lines(lines, max_lines, sample_rate, keep_raw)
             else:
                 # Local file
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                    for line_num, line in enumerate(file, 1):
-                        if lines_processed >= max_lines:
-                            break
-                            
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # Apply sampling only if sample_rate < 1.0
-                        if sample_rate < 1.0:
-                            import random
-                            if random.random() > sample_rate:
-                                continue
-                        
-                        parsed_entry = self.parse_line(line, line_num)
-                        if parsed_entry:
-                            parsed_logs.append(parsed_entry)
-                            lines_processed += 1
+                    yield from self._iter_lines(file, max_lines, sample_rate, keep_raw)
                         
         except Exception as e:
-            raise Exception(f"Error parsing file {file_path}: {str(e)}")
+            raise Exception(f"Error parsing file {file_path}: {str(e)}") from e
+    
+    def _iter_lines(self, lines: Iterable[str], max_lines: int, sample_rate: float,
+                    keep_raw: bool = True) -> Iterator[Dict[str, Any]]:
+        """Parse up to max_lines non-empty lines, keeping each with probability sample_rate"""
+        lines_processed = 0
+        sampling = sample_rate < 1.0
+        rand = random.random
         
-        return parsed_logs
+        for line_num, line in enumerate(lines, 1):
+            if lines_processed >= max_lines:
+                break
+                
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Apply sampling only if sample_rate < 1.0
+            if sampling and rand() > sample_rate:
+                continue
+            
+            parsed_entry = self.parse_line(line, line_num)
+            if parsed_entry:
+                if not keep_raw:
+                    # Lets the line itself be freed when no other field refers to it
+                    del parsed_entry['raw_line']
+                yield parsed_entry
+                lines_processed += 1
     
     def parse_line(self, line: str, line_num: int) -> Dict[str, Any]:
         """Parse a single log line"""
-        # Try to detect log format
-        if self.patterns['json'].match(line):
+        # Detect log format from the first character so each line only runs the patterns that
+        # can match it; the formats are mutually exclusive, so the result is the same as trying all
+        patterns = self.patterns
+        first = line[:1]
+        if first == '{' and line[-1:] == '}':
             return self._parse_json_line(line, line_num)
-        elif self.patterns['apache_error'].match(line):
-            return self._parse_apache_error_line(line, line_num)
-        elif self.patterns['apache'].match(line):
-            return self._parse_apache_line(line, line_num)
-        elif self.patterns['syslog'].match(line):
-            return self._parse_syslog_line(line, line_num)
-        else:
-            return self._parse_generic_line(line, line_num)
+        if first == '[':
+            match = patterns['apache_error'].match(line)
+            if match:
+                return self._parse_apache_error_line(line, line_num, match)
+        match = patterns['apache'].match(line)
+        if match:
+            return self._parse_apache_line(line, line_num, match)
+        match = patterns['syslog'].match(line)
+        if match:
+            return self._parse_syslog_line(line, line_num, match)
+        return self._parse_generic_line(line, line_num)
     
     def _parse_json_line(self, line: str, line_num: int) -> Dict[str, Any]:
         """Parse JSON formatted log line"""
         try:
-            data = json.loads(line)
+            data = _loads_json_line(line)
             return {
                 'line_number': line_num,
                 'timestamp': data.get('timestamp') or data.get('time') or data.get('@timestamp'),
@@ -112,14 +206,15 @@ class LogParser:
         except json.JSONDecodeError:
             return self._parse_generic_line(line, line_num)
     
-    def _parse_apache_line(self, line: str, line_num: int) -> Dict[str, Any]:
+    def _parse_apache_line(self, line: str, line_num: int, match: Optional[re.Match] = None) -> Dict[str, Any]:
         """Parse Apache/Nginx access log line"""
-        match = self.patterns['apache'].match(line)
+        if match is None:
+            match = self.patterns['apache'].match(line)
         if match:
             ip, timestamp, request, status, size = match.groups()
             
-            # Parse request components
-            request_parts = request.split()
+            # Parse request components; only method and URL are kept, so the protocol is left unsplit
+            request_parts = request.split(None, 2)
             method = request_parts[0] if len(request_parts) > 0 else ''
             url = request_parts[1] if len(request_parts) > 1 else ''
             
@@ -129,16 +224,18 @@ class LogParser:
                 'ip_address': ip,
                 'method': method,
                 'url': url,
-                'status_code': int(status) if status.isdigit() else 0,
-                'response_size': int(size) if size.isdigit() else 0,
+                # The pattern captures status as (\d+) and size as (\d+|-), so only '-' needs a default
+                'status_code': int(status),
+                'response_size': int(size) if size != '-' else 0,
                 'raw_line': line,
                 'format': 'apache'
             }
         return None
     
-    def _parse_apache_error_line(self, line: str, line_num: int) -> Dict[str, Any]:
+    def _parse_apache_error_line(self, line: str, line_num: int, match: Optional[re.Match] = None) -> Dict[str, Any]:
         """Parse Apache error log line"""
-        match = self.patterns['apache_error'].match(line)
+        if match is None:
+            match = self.patterns['apache_error'].match(line)
         if match:
             timestamp, level, message = match.groups()
             
@@ -152,9 +249,10 @@ class LogParser:
             }
         return None
     
-    def _parse_syslog_line(self, line: str, line_num: int) -> Dict[str, Any]:
+    def _parse_syslog_line(self, line: str, line_num: int, match: Optional[re.Match] = None) -> Dict[str, Any]:
         """Parse syslog format line"""
-        match = self.patterns['syslog'].match(line)
+        if match is None:
+            match = self.patterns['syslog'].match(line)
         if match:
             timestamp, hostname, service, message = match.groups()
             
@@ -196,15 +294,15 @@ class LogParser:
     def _parse_timestamp(self, timestamp_str: str) -> str:
         """Parse various timestamp formats"""
         try:
-            # Common timestamp formats with year
-            formats_with_year = [
-                '%d/%b/%Y:%H:%M:%S %z',  # Apache access logs with timezone
-                '%d/%b/%Y:%H:%M:%S',     # Apache access logs without timezone
-                '%a %b %d %H:%M:%S %Y',  # Apache error logs: Thu Jun 09 06:07:04 2005
-                '%Y-%m-%d %H:%M:%S',     # ISO format
-                '%Y-%m-%dT%H:%M:%S',     # ISO format with T
-                '%Y-%m-%dT%H:%M:%S.%fZ'  # ISO format with microseconds
-            ]
+            # Only try the formats whose literal layout can match this string; the groups are
+            # mutually exclusive, so the first hit is the same one the full list would find
+            formats_with_year, formats_without_year = _candidate_timestamp_formats(timestamp_str)
+            
+            # Access logs repeat one fixed layout on every line, so read its fields directly
+            if formats_with_year is _APACHE_ACCESS_FORMATS:
+                dt = _parse_apache_access_timestamp(timestamp_str)
+                if dt is not None:
+                    return dt.isoformat()
             
             # Try formats with year first
             for fmt in formats_with_year:
@@ -215,12 +313,8 @@ class LogParser:
                     continue
             
             # Formats without year - add current year
-            formats_without_year = [
-                '%b %d %H:%M:%S',        # Syslog format: Jun 09 06:07:04
-                '%a %b %d %H:%M:%S',     # Apache error without year: Thu Jun 09 06:07:04
-            ]
-            
-            current_year = datetime.now().year
+            if formats_without_year:
+                current_year = datetime.now().year
             for fmt in formats_without_year:
                 try:
                     # Parse without year first
@@ -236,3 +330,8 @@ class LogParser:
             
         except Exception:
             return timestamp_str
+
+@lru_cache(maxsize=1)
+def get_parser() -> LogParser:
+    """Return a shared LogParser; it only holds compiled patterns, so it is safe across threads"""
+    return LogParser()
@@ -0,0 +1,34 @@
+import pytest
+from config import get_config
+from services.parser import LogParser
+from services.anomalies import AnomalyDetector
+
+@pytest.fixture(scope="session")
+def parser():
+    """Share one LogParser across the test session; it only holds compiled patterns"""
+    return LogParser()
+
+@pytest.fixture(scope="session")
+def detector():
+    """Share one AnomalyDetector across the test session; it keeps no per-call state"""
+    return AnomalyDetector()
+
+@pytest.fixture
+def test_env(monkeypatch, tmp_path):
+    """Point the config at a throwaway environment with no Supabase project"""
+    for name, value in {'SUPABASE_URL': '', 'SUPABASE_ANON_KEY': 'anon', 'SUPABASE_SERVICE_ROLE_KEY': '',
+                        'SUPABASE_BUCKET': 'logs', 'UPLOAD_FOLDER': str(tmp_path / 'uploads')}.items():
+        monkeypatch.setenv(name, value)
+    get_config.cache_clear()
+    yield
+    get_config.cache_clear()
+
+@pytest.fixture
+def app(test_env):
+    """Build the Flask app against the throwaway environment"""
+    from app import create_app
+    return create_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
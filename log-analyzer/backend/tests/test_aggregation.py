@@ -0,0 +1,28 @@
+from services.aggregation import aggregate_levels, hour_key
+
+class TestAggregation:
+    """Test cases for timeline and level aggregation"""
+    
+    def test_hour_key_formats(self):
+        """Test hour bucketing for the supported timestamp shapes"""
+        assert hour_key('2024-01-15T10:30:00Z') == '2024-01-15 10:00:00'
+        assert hour_key('2024-01-15 10:30:00') == '2024-01-15 10:00:00'
+        assert hour_key('invalid-timestamp') is None
+    
+    def test_aggregate_levels(self):
+        """Test that timeline buckets and level totals are counted together"""
+        logs = [
+            {'timestamp': '2024-01-15T10:00:00Z', 'level': 'ERROR'},
+            {'timestamp': '2024-01-15T10:30:00Z', 'level': 'warn'},
+            {'timestamp': '2024-01-15T11:00:00Z', 'level': 'INFO'},
+            {'timestamp': None, 'level': 'CRITICAL'},
+            {'timestamp': '2024-01-15T11:05:00Z', 'level': 42},
+        ]
+        
+        timeline, level_totals = aggregate_levels(logs)
+        
+        assert level_totals == {'errors': 2, 'warnings': 1, 'info': 2}
+        assert timeline == {
+            '2024-01-15 10:00:00': {'total': 2, 'errors': 1, 'warnings': 1, 'info': 0},
+            '2024-01-15 11:00:00': {'total': 2, 'errors': 0, 'warnings': 0, 'info': 2},
+        }
@@ -1,194 +1,268 @@
-import os
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import Mock, patch, create_autospec
+from openai import OpenAI
+from openai.resources.chat import Chat
+from openai.resources.chat.completions import Completions
 from services.ai_helpers import AIHelper
 
 
+def _openai_client():
+    """Build a fixed-shape OpenAI client double whose chat.completions.create checks its call signature"""
+    client = create_autospec(OpenAI, instance=True)
+    # chat is assigned in OpenAI.__init__, so autospec cannot see it on the class
+    client.chat = create_autospec(Chat, instance=True)
+    client.chat.completions = create_autospec(Completions, instance=True)
+    return client
+
+
+def _completion(content):
+    """Build a chat completion stand-in carrying the given message content"""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# Read-only, so tests sharing them cannot leak changes into one another
+SAMPLE_LOGS = tuple(MappingProxyType(log) for log in [
+    {'level': 'ERROR', 'message': 'Database connection failed', 'timestamp': '2024-01-01T10:00:00'},
+    {'level': 'WARNING', 'message': 'High memory usage detected', 'timestamp': '2024-01-01T10:01:00'},
+    {'level': 'INFO', 'message': 'User login successful', 'timestamp': '2024-01-01T10:02:00'},
+    {'level': 'ERROR', 'message': 'API timeout occurred', 'timestamp': '2024-01-01T10:03:00'},
+    {'level': 'INFO', 'message': 'Batch job completed', 'timestamp': '2024-01-01T10:04:00'}
+])
+
+SAMPLE_ANOMALIES = tuple(MappingProxyType(anomaly) for anomaly in [
+    {
+        'type': 'error_spike',
+        'severity': 'high',
+        'description': 'Error rate spike detected',
+        'timestamp': '2024-01-01T10:00:00',
+        'details': {'error_count': 10, 'threshold': 2}
+    },
+    {
+        'type': 'unusual_pattern',
+        'severity': 'medium',
+        'description': 'Unusual login pattern detected',
+        'timestamp': '2024-01-01T10:01:00',
+        'details': {'pattern': 'multiple_failed_attempts'}
+    }
+])
+
+ERROR_HEAVY_LOGS = (MappingProxyType({'level': 'ERROR'}),) * 8 + (MappingProxyType({'level': 'INFO'}),) * 2
+NORMAL_LOGS = (MappingProxyType({'level': 'INFO'}),) * 10
+
+
+@pytest.fixture(scope="module")
+def prepared_context():
+    """Build the AI context for the sample data once; it does not depend on the client or key"""
+    with patch('services.ai_helpers.OpenAI'):
+        return AIHelper()._prepare_context(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+
+
 class TestAIHelper:
     """Test cases for AI helper functionality"""
     
-    def setup_method(self):
-        """Setup test data"""
-        self.sample_logs = [
-            {'level': 'ERROR', 'message': 'Database connection failed', 'timestamp': '2024-01-01T10:00:00'},
-            {'level': 'WARNING', 'message': 'High memory usage detected', 'timestamp': '2024-01-01T10:01:00'},
-            {'level': 'INFO', 'message': 'User login successful', 'timestamp': '2024-01-01T10:02:00'},
-            {'level': 'ERROR', 'message': 'API timeout occurred', 'timestamp': '2024-01-01T10:03:00'},
-            {'level': 'INFO', 'message': 'Batch job completed', 'timestamp': '2024-01-01T10:04:00'}
-        ]
-        
-        self.sample_anomalies = [
-            {
-                'type': 'error_spike',
-                'severity': 'high',
-                'description': 'Error rate spike detected',
-                'timestamp': '2024-01-01T10:00:00',
-                'details': {'error_count': 10, 'threshold': 2}
-            },
-            {
-                'type': 'unusual_pattern',
-                'severity': 'medium',
-                'description': 'Unusual login pattern detected',
-                'timestamp': '2024-01-01T10:01:00',
-                'details': {'pattern': 'multiple_failed_attempts'}
-            }
-        ]
-
-    def test_ai_helper_initialization_without_api_key(self):
+    @pytest.fixture
+    def without_api_key(self, monkeypatch):
+        """Run the test with OPENAI_API_KEY unset"""
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    
+    @pytest.fixture
+    def helper_without_key(self, without_api_key):
+        """Build an AIHelper with OPENAI_API_KEY unset"""
+        return AIHelper()
+    
+    @pytest.fixture
+    def with_api_key(self, monkeypatch):
+        """Run the test with a dummy OPENAI_API_KEY"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+
+    def test_ai_helper_initialization_without_api_key(self, helper_without_key):
         """Test AIHelper initialization without API key"""
-        with patch.dict(os.environ, {}, clear=True):
-            helper = AIHelper()
-            assert not helper.enabled
-            assert helper.client is None
+        assert not helper_without_key.enabled
+        assert helper_without_key.client is None
 
-    def test_ai_helper_initialization_with_api_key(self):
+    @patch('services.ai_helpers.OpenAI')
+    def test_ai_helper_initialization_with_api_key(self, mock_openai, with_api_key):
         """Test AIHelper initialization with API key"""
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            with patch('services.ai_helpers.OpenAI') as mock_openai:
-                helper = AIHelper()
-                assert helper.enabled
-                assert helper.client is not None
-                mock_openai.assert_called_once_with(api_key='test-key')
-
-    def test_generate_summary_without_api_key(self):
+        helper = AIHelper()
+        assert helper.enabled
+        assert helper.client is not None
+        mock_openai.assert_called_once_with(api_key='test-key', max_retries=0)
+
+    def test_generate_summary_without_api_key(self, helper_without_key):
         """Test summary generation without API key"""
-        with patch.dict(os.environ, {}, clear=True):
-            helper = AIHelper()
-            result = helper.generate_summary(self.sample_logs, self.sample_anomalies)
-            assert result is None
+        result = helper_without_key.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        assert result is None
 
-    def test_generate_basic_summary(self):
+    def test_generate_basic_summary(self, helper_without_key):
         """Test basic summary generation (fallback)"""
-        with patch.dict(os.environ, {}, clear=True):
-            helper = AIHelper()
-            result = helper._generate_basic_summary(self.sample_logs, self.sample_anomalies)
-            
-            assert 'summary' in result
-            assert 'insights' in result
-            assert 'recommendations' in result
-            assert len(result['insights']) > 0
-            assert len(result['recommendations']) > 0
+        result = helper_without_key._generate_basic_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        
+        assert 'summary' in result
+        assert 'insights' in result
+        assert 'recommendations' in result
+        assert len(result['insights']) > 0
+        assert len(result['recommendations']) > 0
 
     @patch('services.ai_helpers.OpenAI')
-    def test_generate_summary_with_api_success(self, mock_openai_class):
+    def test_generate_summary_with_api_success(self, mock_openai_class, with_api_key):
         """Test successful summary generation with OpenAI API"""
         # Mock the OpenAI client and response
-        mock_client = MagicMock()
+        mock_client = _openai_client()
         mock_openai_class.return_value = mock_client
         
-        # Mock responses for each API call
-        mock_summary_response = MagicMock()
-        mock_summary_response.choices[0].message.content = "System analysis shows high error rates and performance issues."
-        
-        mock_insights_response = MagicMock()
-        mock_insights_response.choices[0].message.content = '["High error rate detected", "Performance degradation observed", "Database connectivity issues"]'
-        
-        mock_recommendations_response = MagicMock()
-        mock_recommendations_response.choices[0].message.content = '["Investigate database connections", "Monitor error patterns", "Review system performance"]'
-        
-        # Set up the mock to return different responses for each call
-        mock_client.chat.completions.create.side_effect = [
-            mock_summary_response,
-            mock_insights_response,
-            mock_recommendations_response
-        ]
-        
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            helper = AIHelper()
-            result = helper.generate_summary(self.sample_logs, self.sample_anomalies)
-            
-            assert result is not None
-            assert 'summary' in result
-            assert 'insights' in result
-            assert 'recommendations' in result
-            assert isinstance(result['insights'], list)
-            assert isinstance(result['recommendations'], list)
-            assert len(result['insights']) > 0
-            assert len(result['recommendations']) > 0
+        # One completion carries the whole summary; insights and recommendations are derived from it
+        mock_response = _completion("System analysis shows high error rates and performance issues. Investigate and monitor the database.")
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        helper = AIHelper()
+        result = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        
+        assert result is not None
+        assert 'summary' in result
+        assert 'insights' in result
+        assert 'recommendations' in result
+        assert isinstance(result['insights'], list)
+        assert isinstance(result['recommendations'], list)
+        assert len(result['insights']) > 0
+        assert len(result['recommendations']) > 0
+        assert result['insights'] == ["System errors detected", "Performance issues identified"]
+        assert result['recommendations'] == ["Investigate detected anomalies", "Monitor system performance"]
+        assert result['ai_generated']
+        assert mock_client.chat.completions.create.call_count == 1
 
     @patch('services.ai_helpers.OpenAI')
-    def test_generate_summary_with_api_failure(self, mock_openai_class):
+    def test_generate_summary_with_api_failure(self, mock_openai_class, with_api_key):
         """Test summary generation with API failure (fallback to basic)"""
-        mock_client = MagicMock()
+        mock_client = _openai_client()
         mock_openai_class.return_value = mock_client
         mock_client.chat.completions.create.side_effect = Exception("API Error")
         
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            helper = AIHelper()
-            result = helper.generate_summary(self.sample_logs, self.sample_anomalies)
-            
-            assert result is not None
-            assert 'summary' in result
-            assert 'insights' in result
-            assert 'recommendations' in result
+        helper = AIHelper()
+        result = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        
+        assert result is not None
+        assert 'summary' in result
+        assert 'insights' in result
+        assert 'recommendations' in result
+        assert not result['ai_generated']
+
+    @patch('services.ai_helpers.OpenAI')
+    def test_fallback_summary_is_not_cached(self, mock_openai_class, with_api_key):
+        """Test that a transient API failure is retried on the next request instead of reusing the fallback"""
+        mock_openai_class.return_value = _openai_client()
+        mock_create = mock_openai_class.return_value.chat.completions.create
+        mock_create.side_effect = [Exception("API Error"), _completion("Investigate the error spike")]
+        
+        helper = AIHelper()
+        first = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        second = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        
+        assert not first['ai_generated']
+        assert second['ai_generated']
+        assert second['summary'] == "Investigate the error spike"
+        assert mock_create.call_count == 2
 
-    def test_prepare_context(self):
+    def test_prepare_context(self, prepared_context):
         """Test context preparation for AI analysis"""
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            with patch('services.ai_helpers.OpenAI'):
-                helper = AIHelper()
-                context = helper._prepare_context(self.sample_logs, self.sample_anomalies)
-                
-                assert 'Total log entries: 5' in context
-                assert 'Total anomalies detected: 2' in context
-                assert 'error_spike' in context
-                assert 'unusual_pattern' in context
+        assert 'Total log entries: 5' in prepared_context
+        assert 'Total anomalies detected: 2' in prepared_context
+        assert 'error_spike' in prepared_context
+        assert 'unusual_pattern' in prepared_context
 
     @patch('services.ai_helpers.OpenAI')
-    def test_generate_insights_json_response(self, mock_openai_class):
+    def test_generate_insights_json_response(self, mock_openai_class, with_api_key, prepared_context):
         """Test insights generation with JSON response"""
-        mock_client = MagicMock()
+        mock_client = _openai_client()
         mock_openai_class.return_value = mock_client
         
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = '["High error rate detected", "System performance issues"]'
+        mock_response = _completion('["High error rate detected", "System performance issues"]')
         mock_client.chat.completions.create.return_value = mock_response
         
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            helper = AIHelper()
-            context = helper._prepare_context(self.sample_logs, self.sample_anomalies)
-            insights = helper._generate_insights(context)
-            
-            assert isinstance(insights, list)
-            assert len(insights) == 2
-            assert "High error rate detected" in insights
+        helper = AIHelper()
+        insights = helper._generate_insights(prepared_context)
+        
+        assert isinstance(insights, list)
+        assert len(insights) == 2
+        assert "High error rate detected" in insights
 
     @patch('services.ai_helpers.OpenAI')
-    def test_generate_recommendations_json_response(self, mock_openai_class):
+    def test_generate_recommendations_json_response(self, mock_openai_class, with_api_key, prepared_context):
         """Test recommendations generation with JSON response"""
-        mock_client = MagicMock()
+        mock_client = _openai_client()
         mock_openai_class.return_value = mock_client
         
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = '["Investigate database issues", "Monitor system performance"]'
+        mock_response = _completion('["Investigate database issues", "Monitor system performance"]')
         mock_client.chat.completions.create.return_value = mock_response
         
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-            helper = AIHelper()
-            context = helper._prepare_context(self.sample_logs, self.sample_anomalies)
-            recommendations = helper._generate_recommendations(context)
-            
-            assert isinstance(recommendations, list)
-            assert len(recommendations) == 2
-            assert "Investigate database issues" in recommendations
+        helper = AIHelper()
+        recommendations = helper._generate_recommendations(prepared_context)
+        
+        assert isinstance(recommendations, list)
+        assert len(recommendations) == 2
+        assert "Investigate database issues" in recommendations
 
-    def test_analyze_log_patterns_without_api_key(self):
+    def test_analyze_log_patterns_without_api_key(self, helper_without_key):
         """Test log pattern analysis without API key"""
-        with patch.dict(os.environ, {}, clear=True):
-            helper = AIHelper()
-            result = helper.analyze_log_patterns(self.sample_logs)
-            assert 'error' in result
+        result = helper_without_key.analyze_log_patterns(SAMPLE_LOGS)
+        assert 'error' in result
 
     def test_suggest_improvements(self):
         """Test system improvement suggestions"""
         helper = AIHelper()
         
         # Test with high error rate
-        error_heavy_logs = [{'level': 'ERROR'} for _ in range(8)] + [{'level': 'INFO'} for _ in range(2)]
-        suggestions = helper.suggest_improvements(error_heavy_logs, [])
-        assert any("High error rate detected" in suggestion for suggestion in suggestions)
+        suggestions = helper.suggest_improvements(ERROR_HEAVY_LOGS, [])
+        assert "High error rate detected - review system configuration" in suggestions
         
         # Test with normal logs
-        normal_logs = [{'level': 'INFO'} for _ in range(10)]
-        suggestions = helper.suggest_improvements(normal_logs, [])
+        suggestions = helper.suggest_improvements(NORMAL_LOGS, [])
         assert len(suggestions) > 0
+
+    @patch('services.ai_helpers.OpenAI')
+    def test_summary_cached_for_identical_context(self, mock_openai_class, with_api_key):
+        """Test that repeated analysis of the same logs reuses the OpenAI summary"""
+        mock_openai_class.return_value = _openai_client()
+        mock_create = mock_openai_class.return_value.chat.completions.create
+        mock_create.return_value = _completion("Investigate the error spike")
+        
+        helper = AIHelper()
+        first = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        second = helper.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        helper.generate_summary(SAMPLE_LOGS[:2], SAMPLE_ANOMALIES)
+        
+        assert first == second
+        assert mock_create.call_count == 2
+
+    def test_keyword_extraction_single_pass(self):
+        """Test insight and recommendation extraction keeps keyword order and overlapping hits"""
+        helper = AIHelper()
+        
+        insights = helper._extract_insights("Network ACCESS errors; review security")
+        assert insights == ["System errors detected", "Security concerns raised",
+                            "Network activity patterns identified", "Access patterns analyzed"]
+        
+        recommendations = helper._extract_recommendations("backupdate")
+        assert recommendations == ["Consider system updates", "Verify backup systems"]
+        
+        assert helper._extract_insights("all quiet") == ["No specific insights available"]
+
+    def test_generate_summary_async(self, helper_without_key):
+        """Test that the background summary resolves to the same result as the blocking call"""
+        future = helper_without_key.generate_summary_async(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+        assert future.result(timeout=5) == helper_without_key.generate_summary(SAMPLE_LOGS, SAMPLE_ANOMALIES)
+
+    @patch('services.ai_helpers.OpenAI')
+    def test_generate_summary_async_fan_out(self, mock_openai_class, with_api_key):
+        """Test that several background summaries run side by side against the mocked client"""
+        mock_openai_class.return_value = _openai_client()
+        mock_create = mock_openai_class.return_value.chat.completions.create
+        mock_create.return_value = _completion("Investigate the error spike")
+
+        helper = AIHelper()
+        cases = [SAMPLE_LOGS[:n] for n in range(1, len(SAMPLE_LOGS) + 1)]
+        futures = [helper.generate_summary_async(logs, SAMPLE_ANOMALIES) for logs in cases]
+        results = [future.result(timeout=5) for future in futures]
+
+        assert all(result['summary'] == "Investigate the error spike" for result in results)
+        assert mock_create.call_count == len(cases)
@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import create_autospec, patch
+from openai import OpenAI
+from openai.resources.chat import Chat
+from openai.resources.chat.completions import Completions
+from services.ai_helpers import AIHelper
+from utils.security import AuthUser
+
+AUTH_HEADERS = {'Authorization': 'Bearer token'}
+USER = AuthUser(id='user-1', email=None, role='user', provider='jwt')
+
+class TestAnalysisRoutes:
+    """Test cases for the analysis endpoints"""
+    
+    def _ai_helper(self, monkeypatch, side_effect):
+        """Build an AIHelper whose OpenAI client returns or raises the given completions in turn"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+        client = create_autospec(OpenAI, instance=True)
+        client.chat = create_autospec(Chat, instance=True)
+        client.chat.completions = create_autospec(Completions, instance=True)
+        client.chat.completions.create.side_effect = side_effect
+        with patch('services.ai_helpers.OpenAI', return_value=client):
+            return AIHelper()
+    
+    def test_analyze_does_not_cache_fallback_summary(self, app, client, monkeypatch, tmp_path):
+        """Test that an analysis built on a failed OpenAI call is recomputed on the next request"""
+        log_file = tmp_path / 'app.log'
+        log_file.write_text("2024-01-15 10:30:00 [ERROR] Database connection failed\n")
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Investigate the database"))])
+        helper = self._ai_helper(monkeypatch, [Exception("API Error"), completion])
+        app.config['OPENAI_API_KEY'] = 'test-key'
+        
+        with patch('routes.auth.validate_jwt_token', return_value=USER), \
+                patch('routes.analysis.get_ai_helper', return_value=helper):
+            first = client.post('/api/analysis/analyze', json={'file_path': str(log_file)}, headers=AUTH_HEADERS)
+            second = client.post('/api/analysis/analyze', json={'file_path': str(log_file)}, headers=AUTH_HEADERS)
+        
+        assert first.status_code == second.status_code == 200
+        assert first.get_json()['ai_summary']['summary'] != "Investigate the database"
+        assert second.get_json()['ai_summary']['summary'] == "Investigate the database"
+        assert helper.client.chat.completions.create.call_count == 2
+    
+    def test_analyze_falls_back_when_summary_times_out(self, app, client, monkeypatch, tmp_path):
+        """Test that a stalled OpenAI call yields the basic summary instead of holding the request"""
+        log_file = tmp_path / 'app.log'
+        log_file.write_text("2024-01-15 10:30:00 [ERROR] Database connection failed\n")
+        release = threading.Event()
+        helper = self._ai_helper(monkeypatch, lambda **kwargs: release.wait(5))
+        app.config['OPENAI_API_KEY'] = 'test-key'
+        monkeypatch.setattr('routes.analysis._AI_SUMMARY_TIMEOUT', 0.05)
+        
+        try:
+            with patch('routes.auth.validate_jwt_token', return_value=USER), \
+                    patch('routes.analysis.get_ai_helper', return_value=helper):
+                response = client.post('/api/analysis/analyze', json={'file_path': str(log_file)}, headers=AUTH_HEADERS)
+        finally:
+            release.set()
+        
+        assert response.status_code == 200
+        assert response.get_json()['ai_summary']['summary'].startswith('Analysis complete.')
@@ -1,81 +1,98 @@
 import pytest
+import time
 from datetime import datetime, timedelta
-from services.anomalies import AnomalyDetector
+import statistics
+from services.anomalies import _hour_key, _mean_stdev
+
+@pytest.fixture(scope="module")
+def large_logs():
+    """Build the large synthetic dataset once per module; the detector only reads it"""
+    start = datetime(2024, 1, 15)
+    minute = timedelta(minutes=1)
+    return [
+        {
+            'timestamp': (start + i * minute).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'level': 'INFO' if i % 10 != 0 else 'ERROR',
+            'message': f'Log entry {i}',
+            'format': 'generic'
+        }
+        for i in range(10000)
+    ]
+
+@pytest.fixture(scope="module")
+def sample_logs():
+    """Create sample log data once per module; a tuple so no test can append to the shared copy"""
+    return (
+        {
+            'timestamp': '2024-01-15T10:00:00Z',
+            'level': 'INFO',
+            'message': 'Application started',
+            'format': 'generic'
+        },
+        {
+            'timestamp': '2024-01-15T10:01:00Z',
+            'level': 'ERROR',
+            'message': 'Database connection failed',
+            'format': 'generic'
+        },
+        {
+            'timestamp': '2024-01-15T10:02:00Z',
+            'level': 'ERROR',
+            'message': 'Database connection failed',
+            'format': 'generic'
+        },
+        {
+            'timestamp': '2024-01-15T10:03:00Z',
+            'level': 'INFO',
+            'message': 'User login successful',
+            'format': 'generic'
+        },
+        {
+            'timestamp': '2024-01-15T10:04:00Z',
+            'level': 'ERROR',
+            'message': 'Database connection failed',
+            'format': 'generic'
+        }
+    )
+
+@pytest.fixture(scope="module")
+def apache_logs():
+    """Create sample Apache access logs once per module; a tuple so no test can append to the shared copy"""
+    return (
+        {
+            'timestamp': '2024-01-15T10:00:00Z',
+            'ip_address': '192.168.1.100',
+            'method': 'GET',
+            'url': '/api/users',
+            'status_code': 200,
+            'format': 'apache'
+        },
+        {
+            'timestamp': '2024-01-15T10:01:00Z',
+            'ip_address': '192.168.1.100',
+            'method': 'GET',
+            'url': '/api/users',
+            'status_code': 404,
+            'format': 'apache'
+        },
+        {
+            'timestamp': '2024-01-15T10:02:00Z',
+            'ip_address': '192.168.1.100',
+            'method': 'POST',
+            'url': '/api/users',
+            'status_code': 500,
+            'format': 'apache'
+        }
+    )
+
+@pytest.fixture(scope="module")
+def all_anomalies(detector, sample_logs):
+    """Run full detection over the sample logs once for the tests that only read the result"""
+    return detector.detect_anomalies(sample_logs)
 
 class TestAnomalyDetector:
     """Test cases for AnomalyDetector service"""
     
-    @pytest.fixture
-    def detector(self):
-        """Create an AnomalyDetector instance for testing"""
-        return AnomalyDetector()
-    
-    @pytest.fixture
-    def sample_logs(self):
-        """Create sample log data for testing"""
-        return [
-            {
-                'timestamp': '2024-01-15T10:00:00Z',
-                'level': 'INFO',
-                'message': 'Application started',
-                'format': 'generic'
-            },
-            {
-                'timestamp': '2024-01-15T10:01:00Z',
-                'level': 'ERROR',
-                'message': 'Database connection failed',
-                'format': 'generic'
-            },
-            {
-                'timestamp': '2024-01-15T10:02:00Z',
-                'level': 'ERROR',
-                'message': 'Database connection failed',
-                'format': 'generic'
-            },
-            {
-                'timestamp': '2024-01-15T10:03:00Z',
-                'level': 'INFO',
-                'message': 'User login successful',
-                'format': 'generic'
-            },
-            {
-                'timestamp': '2024-01-15T10:04:00Z',
-                'level': 'ERROR',
-                'message': 'Database connection failed',
-                'format': 'generic'
-            }
-        ]
-    
-    @pytest.fixture
-    def apache_logs(self):
-        """Create sample Apache access logs for testing"""
-        return [
-            {
-                'timestamp': '2024-01-15T10:00:00Z',
-                'ip_address': '192.168.1.100',
-                'method': 'GET',
-                'url': '/api/users',
-                'status_code': 200,
-                'format': 'apache'
-            },
-            {
-                'timestamp': '2024-01-15T10:01:00Z',
-                'ip_address': '192.168.1.100',
-                'method': 'GET',
-                'url': '/api/users',
-                'status_code': 404,
-                'format': 'apache'
-            },
-            {
-                'timestamp': '2024-01-15T10:02:00Z',
-                'ip_address': '192.168.1.100',
-                'method': 'POST',
-                'url': '/api/users',
-                'status_code': 500,
-                'format': 'apache'
-            }
-        ]
-    
     def test_detector_initialization(self, detector):
         """Test AnomalyDetector initialization"""
         assert detector is not None
@@ -121,14 +138,14 @@ class TestAnomalyDetector:
     def test_detect_time_anomalies(self, detector, sample_logs):
         """Test time anomaly detection"""
         # Add some logs outside business hours
-        sample_logs.append({
+        logs = [*sample_logs, {
             'timestamp': '2024-01-15T02:00:00Z',  # 2 AM
             'level': 'ERROR',
             'message': 'Night error',
             'format': 'generic'
-        })
+        }]
         
-        anomalies = detector._detect_time_anomalies(sample_logs)
+        anomalies = detector._detect_time_anomalies(logs)
         
         # Should detect errors outside business hours
         time_anomalies = [a for a in anomalies if a['type'] == 'time_anomaly']
@@ -137,17 +154,19 @@ class TestAnomalyDetector:
     def test_detect_ip_anomalies(self, detector, apache_logs):
         """Test IP anomaly detection"""
         # Add more logs from the same IP to trigger detection
-        for i in range(100):
-            apache_logs.append({
-                'timestamp': f'2024-01-15T10:{i+5:02d}:00Z',
+        logs = [*apache_logs, *(
+            {
+                'timestamp': f'2024-01-15T{10 + (i+5)//60:02d}:{(i+5)%60:02d}:00Z',
                 'ip_address': '192.168.1.100',
                 'method': 'GET',
                 'url': f'/api/test{i}',
                 'status_code': 404,
                 'format': 'apache'
-            })
+            }
+            for i in range(100)
+        )]
         
-        anomalies = detector._detect_ip_anomalies(apache_logs)
+        anomalies = detector._detect_ip_anomalies(logs)
         
         # Should detect suspicious IP activity
         ip_anomalies = [a for a in anomalies if a['type'] == 'ip_anomaly']
@@ -156,55 +175,49 @@ class TestAnomalyDetector:
     def test_detect_status_anomalies(self, detector, apache_logs):
         """Test status code anomaly detection"""
         # Add more error status codes
-        for i in range(20):
-            apache_logs.append({
-                'timestamp': f'2024-01-15T10:{i+5:02d}:00Z',
+        logs = [*apache_logs, *(
+            {
+                'timestamp': f'2024-01-15T{10 + (i+5)//60:02d}:{(i+5)%60:02d}:00Z',
                 'ip_address': '192.168.1.101',
                 'method': 'GET',
                 'url': f'/api/test{i}',
                 'status_code': 500,
                 'format': 'apache'
-            })
+            }
+            for i in range(20)
+        )]
         
-        anomalies = detector._detect_status_anomalies(apache_logs)
+        anomalies = detector._detect_status_anomalies(logs)
         
         # Should detect high rate of 5xx errors
         status_anomalies = [a for a in anomalies if a['type'] == 'status_anomaly']
         assert len(status_anomalies) > 0
     
-    def test_detect_all_anomalies(self, detector, sample_logs):
+    def test_detect_all_anomalies(self, all_anomalies):
         """Test detection of all anomaly types"""
-        anomalies = detector.detect_anomalies(sample_logs)
-        
         # Should detect multiple types of anomalies
-        assert len(anomalies) > 0
+        assert len(all_anomalies) > 0
         
         # Check that we have different types
-        anomaly_types = set(a['type'] for a in anomalies)
+        anomaly_types = set(a['type'] for a in all_anomalies)
         assert len(anomaly_types) > 1
     
-    def test_anomaly_severity_levels(self, detector, sample_logs):
+    def test_anomaly_severity_levels(self, all_anomalies):
         """Test anomaly severity levels"""
-        anomalies = detector.detect_anomalies(sample_logs)
-        
-        for anomaly in anomalies:
+        for anomaly in all_anomalies:
             assert 'severity' in anomaly
             assert anomaly['severity'] in ['low', 'medium', 'high']
     
-    def test_anomaly_timestamp_format(self, detector, sample_logs):
+    def test_anomaly_timestamp_format(self, all_anomalies):
         """Test anomaly timestamp format"""
-        anomalies = detector.detect_anomalies(sample_logs)
-        
-        for anomaly in anomalies:
+        for anomaly in all_anomalies:
             if 'timestamp' in anomaly:
                 # Should be ISO format
                 assert 'T' in anomaly['timestamp'] or '-' in anomaly['timestamp']
     
-    def test_anomaly_details_structure(self, detector, sample_logs):
+    def test_anomaly_details_structure(self, all_anomalies):
         """Test anomaly details structure"""
-        anomalies = detector.detect_anomalies(sample_logs)
-        
-        for anomaly in anomalies:
+        for anomaly in all_anomalies:
             assert 'details' in anomaly
             assert isinstance(anomaly['details'], dict)
     
@@ -244,24 +257,37 @@ class TestAnomalyDetector:
         # Should handle invalid timestamps gracefully
         assert isinstance(anomalies, list)
     
-    def test_performance_large_dataset(self, detector):
-        """Test performance with large dataset"""
-        # Create large dataset
-        large_logs = []
-        for i in range(10000):
-            large_logs.append({
-                'timestamp': f'2024-01-15T{i//60:02d}:{i%60:02d}:00Z',
-                'level': 'INFO' if i % 10 != 0 else 'ERROR',
-                'message': f'Log entry {i}',
-                'format': 'generic'
-            })
+    def test_mixed_zoned_and_plain_timestamps(self, detector):
+        """Test that zoned and plain timestamps in one file are bucketed together as UTC"""
+        mixed_logs = [
+            {'timestamp': '2024-01-15T10:00:00Z', 'level': 'ERROR', 'message': 'Zoned error', 'format': 'generic'},
+            {'timestamp': '2024-01-15T15:45:00+05:30', 'level': 'ERROR', 'message': 'Offset error', 'format': 'generic'},
+            {'timestamp': '2024-01-15 09:00:00', 'level': 'INFO', 'message': 'Plain info', 'format': 'generic'},
+            {'timestamp': '2024-01-15 10:30:00', 'level': 'INFO', 'message': 'Plain info', 'format': 'generic'}
+        ]
         
+        anomalies = detector.detect_anomalies(mixed_logs)
+        
+        assert isinstance(anomalies, list)
+        assert _hour_key('2024-01-15T15:45:00+05:30') == _hour_key('2024-01-15 10:00:00')
+    
+    def test_performance_large_dataset(self, detector, large_logs):
+        """Test performance with large dataset"""
         # Should complete within reasonable time
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         anomalies = detector.detect_anomalies(large_logs)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         # Should complete in less than 5 seconds
         assert end_time - start_time < 5.0
         assert isinstance(anomalies, list)
+    
+    def test_mean_stdev_matches_statistics(self):
+        """Test the fast mean/stdev against the statistics module"""
+        for values in ([1, 2, 3, 10], [4, 6], [0.1, 0.25, 0.3, 0.05], [0.2, 0.2, 0.2]):
+            mean, std = _mean_stdev(values)
+            assert mean == statistics.mean(values)
+            assert std == pytest.approx(statistics.stdev(values), rel=1e-12)
+        
+        assert _mean_stdev([7, 7]) == (7, 0.0)
+        assert isinstance(_mean_stdev([4, 6])[0], int)
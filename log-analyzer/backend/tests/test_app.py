@@ -0,0 +1,34 @@
+ALLOWED_ORIGIN = 'https://log-analyzer-sepia.vercel.app'
+
+class TestCors:
+    """Test cases for the CORS headers added to every response"""
+    
+    def test_allowed_origin_gets_cors_headers(self, client):
+        """Test that an allowed origin is echoed back with credentials allowed"""
+        response = client.get('/health', headers={'Origin': ALLOWED_ORIGIN})
+        
+        assert response.status_code == 200
+        assert response.headers['Access-Control-Allow-Origin'] == ALLOWED_ORIGIN
+        assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+        assert 'Origin' in response.headers['Vary']
+    
+    def test_disallowed_origin_gets_no_cors_headers(self, client):
+        """Test that other origins get no CORS headers"""
+        response = client.get('/health', headers={'Origin': 'https://evil.example.com'})
+        
+        assert response.status_code == 200
+        assert not any(name.startswith('Access-Control-') for name in response.headers.keys())
+        assert 'Origin' in response.headers['Vary']
+    
+    def test_preflight_echoes_methods_and_headers(self, client):
+        """Test that a preflight from an allowed origin lists the route's methods and the requested headers"""
+        response = client.options('/api/analysis/analyze', headers={
+            'Origin': ALLOWED_ORIGIN,
+            'Access-Control-Request-Method': 'POST',
+            'Access-Control-Request-Headers': 'Authorization, Content-Type'
+        })
+        
+        assert response.status_code == 200
+        assert response.headers['Access-Control-Allow-Origin'] == ALLOWED_ORIGIN
+        assert 'POST' in response.headers['Access-Control-Allow-Methods']
+        assert response.headers['Access-Control-Allow-Headers'] == 'Authorization, Content-Type'
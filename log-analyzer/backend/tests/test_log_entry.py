@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime
+from models.log_entry import LogEntry, LogLevelInt
+
+class TestLogEntry:
+    """Test cases for the LogEntry model"""
+    
+    @pytest.fixture
+    def entries(self):
+        """Create a small batch of log entries for testing"""
+        return [
+            LogEntry(level='ERROR', message='Database connection failed', line_number=1, tags=['db']),
+            LogEntry(level='warn', message='High memory usage', line_number=2, created_at=datetime(2024, 1, 15, 10, 30)),
+            LogEntry(level='INFO', message='Request served', line_number=3, status_code=200)
+        ]
+    
+    def test_to_dict_round_trip(self, entries):
+        """Test that from_dict restores what to_dict produced"""
+        for entry in entries:
+            assert LogEntry.from_dict(entry.to_dict()) == entry
+    
+    def test_level_checks(self, entries):
+        """Test level helpers are case-insensitive"""
+        assert entries[0].is_error()
+        assert entries[1].is_warning()
+        assert entries[1].get_severity_score() == 2
+        assert entries[2].is_info()
+    
+    def test_unknown_level_checks(self):
+        """Test unknown or empty levels match no level helper and score as INFO"""
+        for level in ('TRACE', ''):
+            entry = LogEntry(level=level)
+            assert not entry.is_error()
+            assert not entry.is_warning()
+            assert not entry.is_info()
+            assert entry.get_severity_score() == 1
+    
+    def test_level_reassignment_updates_checks(self, entries):
+        """Test level helpers follow the current level after it is reassigned"""
+        entry = entries[2]
+        entry.level = 'ERROR'
+        
+        assert entry.is_error()
+        assert not entry.is_info()
+        assert entry.severity == LogLevelInt.ERROR
+    
+    def test_severity_ordering(self, entries):
+        """Test severity is stored as an ordered int enum"""
+        assert entries[0].severity == LogLevelInt.ERROR
+        assert entries[0].severity > entries[1].severity > entries[2].severity
+        assert LogEntry(level='FATAL').get_severity_score() == 5
+        assert LogEntry(level='unknown').get_severity_score() == 1
@@ -0,0 +1,66 @@
+import os
+import time
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from utils import parse_jobs
+
+class TestParseJobs:
+    """Test cases for background parse job records"""
+    
+    @pytest.fixture
+    def jobs_dir(self, tmp_path, monkeypatch):
+        """Keep job records in a temporary directory and never start a parse"""
+        monkeypatch.setattr(parse_jobs, '_jobs_dir', lambda: str(tmp_path))
+        monkeypatch.setattr(parse_jobs, '_executor', MagicMock())
+        monkeypatch.setattr(parse_jobs, '_next_prune', 0.0)
+        return tmp_path
+    
+    def _expire(self, path):
+        expired = time.time() - parse_jobs._JOB_TTL - 60
+        os.utime(path, (expired, expired))
+    
+    def test_submit_prunes_expired_records(self, jobs_dir):
+        """Test that submitting a job removes records older than the TTL and keeps recent ones"""
+        stale = jobs_dir / 'stale.json'
+        stale.write_text('{}')
+        self._expire(stale)
+        recent = jobs_dir / 'recent.json'
+        recent.write_text('{}')
+        
+        job_id = parse_jobs.submit_parse('/uploads/app.log', 'user-1')
+        
+        assert not stale.exists()
+        assert recent.exists()
+        assert parse_jobs.get_job(job_id)['state'] == 'queued'
+    
+    def test_status_poll_prunes_expired_records(self, jobs_dir):
+        """Test that polling a job also removes expired records when no new jobs are submitted"""
+        stale = jobs_dir / 'stale.json'
+        stale.write_text('{}')
+        self._expire(stale)
+        
+        assert parse_jobs.get_job(uuid.uuid4().hex) is None
+        assert not stale.exists()
+    
+    def test_running_job_refreshes_its_record(self, jobs_dir, monkeypatch):
+        """Test that a long parse keeps its record fresh so it is not pruned mid-job"""
+        monkeypatch.setattr(parse_jobs, '_HEARTBEAT_INTERVAL', 0)
+        job_id = uuid.uuid4().hex
+        record = jobs_dir / f'{job_id}.json'
+        seen_mtimes = []
+        
+        def iter_file(file_path):
+            self._expire(record)
+            yield {'line_number': 1}
+            seen_mtimes.append(record.stat().st_mtime)
+            yield {'line_number': 2}
+        
+        with patch('services.parser.get_parser', return_value=SimpleNamespace(iter_file=iter_file)):
+            parse_jobs._run_parse(job_id, '/uploads/app.log', 'user-1')
+        
+        assert seen_mtimes[0] > time.time() - parse_jobs._JOB_TTL
+        job = parse_jobs.get_job(job_id)
+        assert job['state'] == 'finished'
+        assert job['result'] == [{'line_number': 1}, {'line_number': 2}]
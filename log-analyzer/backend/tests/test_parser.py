@@ -1,30 +1,17 @@
 import pytest
-import tempfile
-import os
-from services.parser import LogParser
 
 class TestLogParser:
     """Test cases for LogParser service"""
     
     @pytest.fixture
-    def parser(self):
-        """Create a LogParser instance for testing"""
-        return LogParser()
-    
-    @pytest.fixture
-    def temp_log_file(self):
+    def temp_log_file(self, tmp_path):
         """Create a temporary log file for testing"""
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.log') as f:
-            f.write("""2024-01-15 10:30:00 [INFO] Application started
+        path = tmp_path / 'test.log'
+        path.write_text("""2024-01-15 10:30:00 [INFO] Application started
 2024-01-15 10:30:01 [ERROR] Database connection failed
 2024-01-15 10:30:02 [WARNING] High memory usage detected
 """)
-            temp_file = f.name
-        
-        yield temp_file
-        
-        # Cleanup
-        os.unlink(temp_file)
+        return str(path)
     
     def test_parser_initialization(self, parser):
         """Test LogParser initialization"""
@@ -118,43 +105,67 @@ class TestLogParser:
         
         assert result is None
     
-    def test_timestamp_parsing_formats(self, parser):
+    @pytest.mark.parametrize("line, expected", [
+        ("2024-01-15T10:30:00Z [INFO] Message 1", '2024-01-15T10:30:00Z'),  # ISO format
+        ("2024-01-15 10:30:00 [INFO] Message 2", '2024-01-15 10:30:00'),    # Space-separated format
+    ], ids=['iso', 'space'])
+    def test_timestamp_parsing_formats(self, parser, line, expected):
         """Test parsing various timestamp formats"""
-        # Test ISO format
-        line1 = "2024-01-15T10:30:00Z [INFO] Message 1"
-        result1 = parser.parse_line(line1, 1)
-        assert result1['timestamp'] == '2024-01-15T10:30:00Z'
-        
-        # Test space-separated format
-        line2 = "2024-01-15 10:30:00 [INFO] Message 2"
-        result2 = parser.parse_line(line2, 2)
-        assert result2['timestamp'] == '2024-01-15 10:30:00'
+        result = parser.parse_line(line, 1)
+        assert result['timestamp'] == expected
     
-    def test_level_detection(self, parser):
+    @pytest.mark.parametrize("level", ['ERROR', 'WARN', 'WARNING', 'INFO', 'DEBUG', 'CRITICAL', 'FATAL'])
+    def test_level_detection(self, parser, level):
         """Test log level detection"""
-        # Test various level formats
-        levels = ['ERROR', 'WARN', 'WARNING', 'INFO', 'DEBUG', 'CRITICAL', 'FATAL']
-        
-        for level in levels:
-            line = f"2024-01-15 10:30:00 [{level}] Test message"
-            result = parser.parse_line(line, 1)
-            assert result['level'] == level.upper()
+        line = f"2024-01-15 10:30:00 [{level}] Test message"
+        result = parser.parse_line(line, 1)
+        assert result['level'] == level.upper()
     
     def test_parse_file_not_found(self, parser):
         """Test parsing non-existent file"""
-        with pytest.raises(Exception):
+        with pytest.raises(Exception, match='Error parsing file /nonexistent/file.log') as excinfo:
             parser.parse_file('/nonexistent/file.log')
+        assert isinstance(excinfo.value.__cause__, FileNotFoundError)
     
-    def test_parse_large_file(self, parser):
+    def test_parse_large_file(self, parser, tmp_path):
         """Test parsing a large log file"""
-        # Create a large log file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.log') as f:
-            for i in range(1000):
-                f.write(f"2024-01-15 10:30:{i:02d} [INFO] Log entry {i}\n")
-            temp_file = f.name
+        # Create a large log file in one write
+        path = tmp_path / 'large.log'
+        path.write_text(''.join(f"2024-01-15 10:30:{i % 60:02d} [INFO] Log entry {i}\n" for i in range(1000)))
+        
+        results = parser.parse_file(str(path))
+        assert len(results) == 1000
+        assert results[-1]['timestamp'] == '2024-01-15 10:30:39'
+    
+    def test_iter_file_matches_parse_file(self, parser, temp_log_file):
+        """Test that lazy iteration yields the same entries as parse_file"""
+        entries = parser.iter_file(temp_log_file)
+        
+        assert not isinstance(entries, list)
+        assert list(entries) == parser.parse_file(temp_log_file)
+        assert len(list(parser.iter_file(temp_log_file, max_lines=2))) == 2
+    
+    def test_parse_timestamp_shapes(self, parser):
+        """Test that each timestamp shape resolves to its own format"""
+        assert parser._parse_timestamp('10/Oct/2000:13:55:36 -0700') == '2000-10-10T13:55:36-07:00'
+        assert parser._parse_timestamp('10/Oct/2000:13:55:36') == '2000-10-10T13:55:36'
+        assert parser._parse_timestamp('Thu Jun 09 06:07:04 2005') == '2005-06-09T06:07:04'
+        assert parser._parse_timestamp('2024-01-15T10:30:00.123Z') == '2024-01-15T10:30:00.123000'
+        assert parser._parse_timestamp('Jun 09 06:07:04').endswith('-06-09T06:07:04')
+        assert parser._parse_timestamp('not a timestamp') == 'not a timestamp'
+    
+    def test_parse_apache_access_timestamp_fast_path(self, parser):
+        """Test the direct access-log timestamp parser agrees with strptime"""
+        assert parser._parse_timestamp('10/oct/2000:13:55:36 +0530') == '2000-10-10T13:55:36+05:30'
+        assert parser._parse_timestamp('29/Feb/2004:00:00:00') == '2004-02-29T00:00:00'
+        # Layouts and values the fast path rejects still go through strptime
+        assert parser._parse_timestamp('1/Oct/2000:13:55:36') == '2000-10-01T13:55:36'
+        assert parser._parse_timestamp('31/Feb/2000:13:55:36') == '31/Feb/2000:13:55:36'
+    
+    def test_parse_file_without_raw_lines(self, parser, temp_log_file):
+        """Test that keep_raw=False drops only the raw_line field"""
+        full = parser.parse_file(temp_log_file)
+        slim = parser.parse_file(temp_log_file, keep_raw=False)
         
-        try:
-            results = parser.parse_file(temp_file)
-            assert len(results) == 1000
-        finally:
-            os.unlink(temp_file)
+        assert all('raw_line' not in entry for entry in slim)
+        assert slim == [{k: v for k, v in entry.items() if k != 'raw_line'} for entry in full]
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import patch
+from utils.result_cache import ResultCache
+
+class TestResultCache:
+    """Test cases for the analysis result cache"""
+    
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """Create a log file for testing"""
+        path = tmp_path / 'app.log'
+        path.write_text("2024-01-15 10:30:00 [INFO] Application started\n")
+        return str(path)
+    
+    def test_hit_for_unchanged_file(self, log_file):
+        """Test that an unchanged file maps to the same cache entry"""
+        cache = ResultCache()
+        cache.put(cache.make_key(log_file, 'timeline'), b'{}')
+        
+        assert cache.get(cache.make_key(log_file, 'timeline')) == b'{}'
+        assert cache.get(cache.make_key(log_file, 'analyze')) is None
+    
+    def test_miss_after_file_changes(self, log_file):
+        """Test that rewriting the file changes its key"""
+        cache = ResultCache()
+        cache.put(cache.make_key(log_file, 'timeline'), b'{}')
+        
+        with open(log_file, 'a') as f:
+            f.write("2024-01-15 10:30:01 [ERROR] Database connection failed\n")
+        
+        assert cache.get(cache.make_key(log_file, 'timeline')) is None
+    
+    def test_missing_file_is_not_cached(self):
+        """Test that unreadable files produce no key"""
+        cache = ResultCache()
+        key = cache.make_key('/nonexistent/file.log', 'timeline')
+        
+        assert key is None
+        cache.put(key, b'{}')
+        assert cache.get(key) is None
+    
+    def test_lru_eviction_and_invalidate(self, log_file, tmp_path):
+        """Test eviction order and per-file invalidation"""
+        other = tmp_path / 'other.log'
+        other.write_text("other\n")
+        cache = ResultCache(maxsize=2)
+        
+        cache.put(cache.make_key(log_file, 'a'), 1)
+        cache.put(cache.make_key(log_file, 'b'), 2)
+        cache.get(cache.make_key(log_file, 'a'))
+        cache.put(cache.make_key(str(other), 'a'), 3)
+        
+        assert cache.get(cache.make_key(log_file, 'b')) is None
+        assert cache.get(cache.make_key(log_file, 'a')) == 1
+        
+        cache.invalidate(log_file)
+        assert cache.get(cache.make_key(log_file, 'a')) is None
+        assert cache.get(cache.make_key(str(other), 'a')) == 3
+    
+    def test_supabase_key_follows_object_version(self, test_env):
+        """Test that Supabase results are keyed on the object's current version and uncached once it is gone"""
+        cache = ResultCache()
+        identifier = 'supabase://logs/user-1/app.log'
+        
+        with patch('utils.file_storage.get_file_version', return_value='etag-1'):
+            cache.put(cache.make_key(identifier, 'timeline'), b'{}')
+            assert cache.get(cache.make_key(identifier, 'timeline')) == b'{}'
+        
+        with patch('utils.file_storage.get_file_version', return_value='etag-2'):
+            assert cache.get(cache.make_key(identifier, 'timeline')) is None
+        
+        with patch('utils.file_storage.get_file_version', return_value=None):
+            assert cache.make_key(identifier, 'timeline') is None
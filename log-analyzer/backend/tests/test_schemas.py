@@ -264,6 +264,7 @@ class TestSchemas:
         assert isinstance(data, dict)
         assert data["line_number"] == 1
         assert data["level"] == "INFO"
+        assert type(data["level"]) is str
         
         # Test JSON serialization
         json_data = log_entry.model_dump_json()
@@ -0,0 +1,113 @@
+import time
+import jwt
+import pytest
+from dataclasses import FrozenInstanceError
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from utils.security import AuthUser, SecurityManager
+
+class TestSecurityManager:
+    """Test cases for token validation caching"""
+    
+    def _token(self, **claims):
+        return jwt.encode({'sub': 'user-1', 'email': 'user@example.com', **claims}, 'k' * 32, algorithm='HS256')
+    
+    def _unverified_manager(self):
+        """Build a manager with no Supabase project that accepts unverified tokens, as in local development"""
+        manager = SecurityManager()
+        manager._config = SimpleNamespace(SUPABASE_URL=None, SUPABASE_SERVICE_ROLE_KEY=None, ALLOW_UNVERIFIED_JWT=True)
+        return manager
+    
+    def _rs256_token(self, private_key):
+        return jwt.encode({'sub': 'user-1', 'email': 'user@example.com', 'aud': 'authenticated',
+                           'exp': int(time.time()) + 600},
+                          private_key, algorithm='RS256', headers={'kid': 'key-1'})
+    
+    def test_repeat_token_skips_validation(self):
+        """Test that a token validated once is served from the cache"""
+        manager = self._unverified_manager()
+        token = self._token(exp=int(time.time()) + 600)
+        
+        with patch.object(manager, '_validate_jwt_uncached', wraps=manager._validate_jwt_uncached) as validate:
+            first = manager.validate_jwt_token(token)
+            second = manager.validate_jwt_token(token)
+        
+        assert first == second
+        assert first.id == 'user-1'
+        assert validate.call_count == 1
+    
+    def test_expired_token_is_rejected(self):
+        """Test that tokens past their exp claim are rejected every time, without reaching Supabase"""
+        manager = SecurityManager()
+        token = self._token(exp=int(time.time()) - 10)
+        
+        with patch.object(manager, '_init_supabase_client'), \
+                patch.object(manager, '_validate_jwt_uncached', wraps=manager._validate_jwt_uncached) as validate:
+            manager.supabase_client = MagicMock()
+            for _ in range(2):
+                with pytest.raises(Exception, match='expired'):
+                    manager.validate_jwt_token(token)
+        
+        assert validate.call_count == 0
+        manager.supabase_client.auth.get_user.assert_not_called()
+        assert not manager._token_cache
+    
+    def test_jwks_signed_token_skips_supabase(self):
+        """Test that a token verified against the cached JWKS never reaches Supabase"""
+        rsa = pytest.importorskip('cryptography.hazmat.primitives.asymmetric.rsa')
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        token = self._rs256_token(private_key)
+        
+        manager = SecurityManager()
+        manager._jwks_client = MagicMock()
+        manager._jwks_client.get_signing_key_from_jwt.return_value = SimpleNamespace(key=private_key.public_key())
+        
+        with patch.object(manager, '_init_supabase_client'):
+            manager.supabase_client = MagicMock()
+            user = manager.validate_jwt_token(token)
+        
+        manager.supabase_client.auth.get_user.assert_not_called()
+        assert user == AuthUser(id='user-1', email='user@example.com', role='user', provider='supabase')
+    
+    def test_bad_signature_is_rejected(self):
+        """Test that a token failing JWKS verification is rejected outright, even in development mode"""
+        rsa = pytest.importorskip('cryptography.hazmat.primitives.asymmetric.rsa')
+        token = self._rs256_token(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+        other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        
+        manager = self._unverified_manager()
+        manager._jwks_client = MagicMock()
+        manager._jwks_client.get_signing_key_from_jwt.return_value = SimpleNamespace(key=other_key.public_key())
+        
+        with patch.object(manager, '_init_supabase_client'):
+            manager.supabase_client = MagicMock()
+            with pytest.raises(Exception, match='Signature verification failed'):
+                manager.validate_jwt_token(token)
+        
+        manager.supabase_client.auth.get_user.assert_not_called()
+    
+    def test_unverifiable_token_is_rejected_by_default(self):
+        """Test that a token nothing can verify is rejected unless unverified tokens are explicitly allowed"""
+        manager = SecurityManager()
+        manager._config = SimpleNamespace(SUPABASE_URL=None, SUPABASE_SERVICE_ROLE_KEY=None, ALLOW_UNVERIFIED_JWT=False)
+        
+        with pytest.raises(Exception, match='could not be verified'):
+            manager.validate_jwt_token(self._token(exp=int(time.time()) + 600))
+    
+    def test_cached_user_is_immutable(self):
+        """Test that callers can't mutate the cached user info"""
+        manager = self._unverified_manager()
+        token = self._token()
+        user = manager.validate_jwt_token(token)
+        
+        with pytest.raises(FrozenInstanceError):
+            user.role = 'admin'
+        
+        assert manager.validate_jwt_token(token) is user
+        assert user.role == 'user'
+    
+    def test_sanitize_input_strips_dangerous_characters(self):
+        """Test that every dangerous character is removed and the result is trimmed"""
+        manager = SecurityManager()
+        assert manager.sanitize_input(' <script>alert("x");</script> & \'ok\' ') == 'scriptalertx/script  ok'
+        assert manager.sanitize_input('plain text') == 'plain text'
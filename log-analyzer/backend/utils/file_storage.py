@@ -1,20 +1,47 @@
 import os
-import uuid
-from typing import Optional
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 from werkzeug.datastructures import FileStorage
-from supabase import create_client, Client
-from config import Config
+from config import get_config
+from utils.result_cache import result_cache
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Copy uploads to disk in 1 MiB chunks rather than Werkzeug's 16 KiB default
+_SAVE_BUFFER_SIZE = 1 << 20
+
+# Past this many entries, listing stats files on a thread pool; stat releases the GIL,
+# which pays off on network filesystems but only adds overhead for small local folders
+_PARALLEL_STAT_THRESHOLD = 256
+_STAT_WORKERS = 16
+
+def _file_stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+    """Stat a regular file entry, or None for anything else or if it vanished since the listing"""
+    try:
+        return entry.stat() if entry.is_file() else None
+    except OSError:
+        return None
 
 class FileStorageManager:
     """Manages file storage operations for local and Supabase"""
     
     def __init__(self):
-        self.config = Config()
-        self.supabase_client: Optional[Client] = None
+        self.config = get_config()
+        self.supabase_client: Optional['Client'] = None
         self.use_supabase = bool(self.config.SUPABASE_URL and self.config.SUPABASE_SERVICE_ROLE_KEY)
+        # Identifier prefix for objects in the configured bucket, built once
+        self._supabase_prefix = f'supabase://{self.config.SUPABASE_BUCKET}/'
+        
+        # Ensure upload directory exists once, rather than on every save
+        os.makedirs(self.config.UPLOAD_FOLDER, exist_ok=True)
         
         if self.use_supabase:
             try:
+                # Imported only when configured: the supabase package is slow to import
+                from supabase import create_client
                 self.supabase_client = create_client(
                     self.config.SUPABASE_URL,
                     self.config.SUPABASE_SERVICE_ROLE_KEY
@@ -31,45 +58,49 @@ class FileStorageManager:
     
     def _save_to_local(self, file: FileStorage, filename: str) -> str:
         """Save file to local storage"""
-        # Ensure upload directory exists
-        os.makedirs(self.config.UPLOAD_FOLDER, exist_ok=True)
-        
         # Generate unique filename to avoid conflicts
         file_extension = os.path.splitext(filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        unique_filename = f"{secrets.token_hex(16)}{file_extension}"
         file_path = os.path.join(self.config.UPLOAD_FOLDER, unique_filename)
         
-        # Save file
-        file.save(file_path)
+        # Save file, recreating the upload directory if it was removed since startup
+        try:
+            file.save(file_path, buffer_size=_SAVE_BUFFER_SIZE)
+        except FileNotFoundError:
+            os.makedirs(self.config.UPLOAD_FOLDER, exist_ok=True)
+            file.save(file_path, buffer_size=_SAVE_BUFFER_SIZE)
         
         return file_path
     
     def _save_to_supabase(self, file: FileStorage, filename: str, user_id: str) -> str:
         """Save file to Supabase storage"""
+        if not self.supabase_client:
+            return self._save_to_local(file, filename)
+        
+        # Stream the upload to disk in chunks and hand the SDK an open file rather than
+        # reading the whole upload into memory; the local copy doubles as the fallback
+        local_path = self._save_to_local(file, filename)
+        
+        # Generate unique filename
+        file_extension = os.path.splitext(filename)[1]
+        unique_filename = f"{user_id}/{secrets.token_hex(16)}{file_extension}"
+        bucket_name = self.config.SUPABASE_BUCKET
+        
         try:
-            if not self.supabase_client:
-                raise Exception("Supabase client not initialized")
-            
-            # Generate unique filename
-            file_extension = os.path.splitext(filename)[1]
-            unique_filename = f"{user_id}/{uuid.uuid4()}{file_extension}"
-            
-            # Upload to Supabase storage
-            file_content = file.read()
-            bucket_name = self.config.SUPABASE_BUCKET
-            
-            result = self.supabase_client.storage.from_(bucket_name).upload(
-                unique_filename,
-                file_content,
-                {'content-type': file.content_type}
-            )
-            
-            # Return the file identifier
-            return f"supabase://{bucket_name}/{unique_filename}"
-            
+            with open(local_path, 'rb') as local_file:
+                self.supabase_client.storage.from_(bucket_name).upload(
+                    unique_filename,
+                    local_file,
+                    {'content-type': file.content_type}
+                )
         except Exception as e:
             # Fallback to local storage if Supabase fails
-            return self._save_to_local(file, filename)
+            return local_path
+        
+        self._delete_from_local(local_path)
+        
+        # Return the file identifier
+        return f"{self._supabase_prefix}{unique_filename}"
     
     def get_file(self, file_identifier: str) -> Optional[bytes]:
         """Retrieve file content from storage"""
@@ -81,12 +112,10 @@ class FileStorageManager:
     def _get_from_local(self, file_path: str) -> Optional[bytes]:
         """Retrieve file from local storage"""
         try:
-            if os.path.exists(file_path):
-                with open(file_path, 'rb') as f:
-                    return f.read()
-        except Exception:
-            pass
-        return None
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None  # Missing or unreadable
     
     def _get_from_supabase(self, file_identifier: str) -> Optional[bytes]:
         """Retrieve file from Supabase storage"""
@@ -96,7 +125,7 @@ class FileStorageManager:
             
             # Extract path from identifier
             bucket_name = self.config.SUPABASE_BUCKET
-            path = file_identifier.replace(f'supabase://{bucket_name}/', '')
+            path = file_identifier.removeprefix(self._supabase_prefix)
             
             # Download from Supabase
             result = self.supabase_client.storage.from_(bucket_name).download(path)
@@ -105,22 +134,44 @@ class FileStorageManager:
         except Exception as e:
             return None
     
+    def get_file_version(self, file_identifier: str) -> Optional[str]:
+        """Current version tag (etag, else updated_at) of a Supabase object, or None if it is gone or unreachable"""
+        if not self.supabase_client:
+            return None
+        
+        bucket_name = self.config.SUPABASE_BUCKET
+        folder, _, name = file_identifier.removeprefix(self._supabase_prefix).rpartition('/')
+        try:
+            # Search matches by substring, so the exact name is picked out below
+            listing = self.supabase_client.storage.from_(bucket_name).list(folder, {'search': name})
+        except Exception as e:
+            return None
+        
+        for file_info in listing:
+            if file_info.get('name') == name:
+                metadata = file_info.get('metadata') or {}
+                return metadata.get('eTag') or file_info.get('updated_at')
+        return None
+    
     def delete_file(self, file_identifier: str) -> bool:
         """Delete file from storage"""
         if file_identifier.startswith('supabase://'):
-            return self._delete_from_supabase(file_identifier)
+            deleted = self._delete_from_supabase(file_identifier)
         else:
-            return self._delete_from_local(file_identifier)
+            deleted = self._delete_from_local(file_identifier)
+        
+        # Analysis results for the file must not outlive it
+        if deleted:
+            result_cache.invalidate(file_identifier)
+        return deleted
     
     def _delete_from_local(self, file_path: str) -> bool:
         """Delete file from local storage"""
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-        except Exception:
-            pass
-        return False
+            os.remove(file_path)
+            return True
+        except OSError:
+            return False  # Missing or not removable
     
     def _delete_from_supabase(self, file_identifier: str) -> bool:
         """Delete file from Supabase storage"""
@@ -130,7 +181,7 @@ class FileStorageManager:
             
             # Extract path from identifier
             bucket_name = self.config.SUPABASE_BUCKET
-            path = file_identifier.replace(f'supabase://{bucket_name}/', '')
+            path = file_identifier.removeprefix(self._supabase_prefix)
             
             # Delete from Supabase
             self.supabase_client.storage.from_(bucket_name).remove([path])
@@ -150,22 +201,27 @@ class FileStorageManager:
         """List files from local storage"""
         files = []
         try:
-            if os.path.exists(self.config.UPLOAD_FOLDER):
-                for filename in os.listdir(self.config.UPLOAD_FOLDER):
-                    file_path = os.path.join(self.config.UPLOAD_FOLDER, filename)
-                    if os.path.isfile(file_path):
-                        try:
-                            stat = os.stat(file_path)
-                            files.append({
-                                'filename': filename,
-                                'size': stat.st_size,
-                                'created_at': float(stat.st_ctime),  # Ensure it's a float
-                                'path': file_path
-                            })
-                        except Exception as e:
-                            continue
-        except Exception as e:
-            pass
+            # scandir reads entry types with the directory listing, and DirEntry caches its stat
+            with os.scandir(self.config.UPLOAD_FOLDER) as listing:
+                entries = list(listing)
+        except OSError:
+            return files  # Upload folder missing or unreadable: nothing to list
+        
+        if len(entries) > _PARALLEL_STAT_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=_STAT_WORKERS) as executor:
+                stats = list(executor.map(_file_stat, entries))
+        else:
+            stats = map(_file_stat, entries)
+        
+        for entry, stat in zip(entries, stats):
+            if stat is None:
+                continue
+            files.append({
+                'filename': entry.name,
+                'size': stat.st_size,
+                'created_at': stat.st_ctime,
+                'path': entry.path
+            })
         return files
     
     def _list_from_supabase(self, user_id: str) -> list:
@@ -178,23 +234,26 @@ class FileStorageManager:
             # List files in user's folder
             result = self.supabase_client.storage.from_(bucket_name).list(user_id)
             files = []
+            # Every listed object sits in the user's folder, so its identifier prefix is shared
+            path_prefix = f"{self._supabase_prefix}{user_id}/"
             
             for file_info in result:
                 try:
+                    name = file_info['name']
+                    
                     # Parse timestamp if it's a string, otherwise default to current time
                     created_at = file_info.get('created_at', 0)
                     if isinstance(created_at, str):
-                        from datetime import datetime
-                        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                        dt = datetime.fromisoformat(created_at)
                         created_at = dt.timestamp()
                     elif created_at is None:
                         created_at = 0
                     
                     files.append({
-                        'filename': file_info['name'],
+                        'filename': name,
                         'size': file_info.get('metadata', {}).get('size', 0),
                         'created_at': float(created_at),
-                        'path': f"supabase://{bucket_name}/{user_id}/{file_info['name']}"
+                        'path': path_prefix + name
                     })
                 except Exception as e:
                     continue
@@ -215,6 +274,10 @@ def get_file(file_identifier: str) -> Optional[bytes]:
     """Convenience function to get a file"""
     return file_storage.get_file(file_identifier)
 
+def get_file_version(file_identifier: str) -> Optional[str]:
+    """Convenience function to get a Supabase object's version tag"""
+    return file_storage.get_file_version(file_identifier)
+
 def delete_file(file_identifier: str) -> bool:
     """Convenience function to delete a file"""
     return file_storage.delete_file(file_identifier)
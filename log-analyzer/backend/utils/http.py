@@ -0,0 +1,16 @@
+import orjson
+from flask import current_app
+from pydantic import BaseModel
+
+def raw_json_response(body):
+    """Wrap an already-serialized JSON body in a response"""
+    return current_app.response_class(body, mimetype='application/json')
+
+def model_response(model: BaseModel):
+    """Serialize a response model straight to JSON with its compiled pydantic-core serializer"""
+    return raw_json_response(model.model_dump_json())
+
+def json_response(payload):
+    """Serialize a plain dict/list payload with orjson instead of jsonify's stdlib encoder"""
+    # default=str keeps odd values (e.g. exceptions in validation error contexts) from failing the response
+    return raw_json_response(orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS))
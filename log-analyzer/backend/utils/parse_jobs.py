@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import uuid
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from config import get_config
+
+# Job records live on disk so any worker process can answer a status request
+_JOBS_DIRNAME = '.jobs'
+# Seconds a job record is kept after its last update, so clients have time to fetch the result
+_JOB_TTL = 3600
+# A running job touches its record this often so a long parse is never pruned mid-job
+_HEARTBEAT_INTERVAL = _JOB_TTL / 4
+# Status polls also prune, but scan the directory at most this often per process
+_PRUNE_INTERVAL = 60
+
+_prune_lock = threading.Lock()
+_next_prune = 0.0
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='parse-job')
+
+def _jobs_dir() -> str:
+    """Directory holding parse job records, created on first use"""
+    path = os.path.join(get_config().UPLOAD_FOLDER, _JOBS_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(_jobs_dir(), f"{job_id}.json")
+
+def _write_job(job_id: str, record: Dict[str, Any]) -> None:
+    """Replace a job record atomically so readers never see a partial file"""
+    path = _job_path(job_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(record))
+    os.replace(tmp_path, path)
+
+def _prune_jobs() -> None:
+    """Remove job records that haven't been updated within the TTL, at most once per prune interval"""
+    global _next_prune
+    now = time.time()
+    with _prune_lock:
+        if now < _next_prune:
+            return
+        _next_prune = now + _PRUNE_INTERVAL
+    
+    cutoff = now - _JOB_TTL
+    with os.scandir(_jobs_dir()) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Another worker pruned it first
+                pass
+
+def _run_parse(job_id: str, file_path: str, user_id: str) -> None:
+    """Parse the uploaded file and store the outcome in the job record"""
+    from services.parser import get_parser
+    
+    running = {'user_id': user_id, 'file_path': file_path, 'state': 'running'}
+    _write_job(job_id, running)
+    try:
+        result = []
+        next_heartbeat = time.monotonic() + _HEARTBEAT_INTERVAL
+        for entry in get_parser().iter_file(file_path):
+            result.append(entry)
+            if time.monotonic() >= next_heartbeat:
+                # Rewriting the record refreshes its mtime, and restores it if it was pruned anyway
+                _write_job(job_id, running)
+                next_heartbeat = time.monotonic() + _HEARTBEAT_INTERVAL
+    except Exception as e:
+        _write_job(job_id, {'user_id': user_id, 'file_path': file_path, 'state': 'failed', 'error': str(e)})
+        return
+    _write_job(job_id, {'user_id': user_id, 'file_path': file_path, 'state': 'finished', 'result': result})
+
+def submit_parse(file_path: str, user_id: str) -> str:
+    """Queue a background parse of an uploaded file and return its job id"""
+    _prune_jobs()
+    job_id = uuid.uuid4().hex
+    _write_job(job_id, {'user_id': user_id, 'file_path': file_path, 'state': 'queued'})
+    _executor.submit(_run_parse, job_id, file_path, user_id)
+    return job_id
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Load a job record, or None if the id is unknown"""
+    _prune_jobs()
+    
+    # Job ids are uuid hex, which also keeps them from escaping the jobs directory
+    try:
+        uuid.UUID(hex=job_id)
+    except ValueError:
+        return None
+    
+    try:
+        with open(_job_path(job_id), 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
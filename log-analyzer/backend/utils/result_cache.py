@@ -0,0 +1,80 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Only the head of the file is hashed; size and mtime catch changes further in
+_HASH_PREFIX_BYTES = 64 * 1024
+
+def file_fingerprint(file_path: str) -> Optional[str]:
+    """Cheap content fingerprint for a stored log file, or None if it can't be read"""
+    if file_path.startswith('supabase://'):
+        # Any worker may replace or delete the object, so key on the version storage reports now;
+        # a metadata lookup is still far cheaper than downloading and re-parsing the file
+        from utils.file_storage import get_file_version
+        version = get_file_version(file_path)
+        return f"{file_path}:{version}" if version else None
+    
+    try:
+        stat = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            head = f.read(_HASH_PREFIX_BYTES)
+    except OSError:
+        return None
+    
+    digest = hashlib.sha256(head).hexdigest()
+    return f"{digest}:{stat.st_size}:{stat.st_mtime_ns}"
+
+class ResultCache:
+    """Thread-safe LRU cache of analysis results keyed by file fingerprint"""
+    
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def make_key(self, file_path: str, *params: Hashable) -> Optional[Tuple]:
+        """Build a cache key for a file and request parameters, or None if uncacheable"""
+        if not file_path.startswith('supabase://'):
+            file_path = os.path.abspath(file_path)
+        fingerprint = file_fingerprint(file_path)
+        if fingerprint is None:
+            return None
+        return (file_path, fingerprint) + params
+    
+    def get(self, key: Optional[Tuple]) -> Optional[Any]:
+        """Return the cached value for key, or None"""
+        if key is None:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: Optional[Tuple], value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, file_path: str):
+        """Drop every cached result for a file"""
+        if not file_path.startswith('supabase://'):
+            file_path = os.path.abspath(file_path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == file_path]:
+                del self._entries[key]
+    
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+
+# Global instance
+result_cache = ResultCache()
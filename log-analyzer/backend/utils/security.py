@@ -1,27 +1,71 @@
+import logging
+import hashlib
+import os
+import secrets
+import threading
+import time
 import jwt
-import requests
-from typing import Dict, Any, Optional
-from supabase import create_client, Client
-from config import Config
+from jwt.algorithms import has_crypto
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
+from config import get_config
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Validated tokens are remembered until they expire, but never longer than this,
+# so a session revoked in Supabase stops working within a few minutes
+_TOKEN_CACHE_MAX_TTL = 300
+_TOKEN_CACHE_SIZE = 4096
+
+# Supabase publishes its asymmetric signing keys here; PyJWKClient caches them and refetches on an unknown kid
+_JWKS_PATH = '/auth/v1/.well-known/jwks.json'
+_JWKS_ALGORITHMS = ('RS256', 'ES256')
+_JWT_AUDIENCE = 'authenticated'
+
+# Permission hierarchy
+_ROLE_PERMISSIONS = {
+    'admin': frozenset({'read', 'write', 'delete', 'admin'}),
+    'user': frozenset({'read', 'write'}),
+    'guest': frozenset({'read'})
+}
+
+# Potentially dangerous characters stripped by sanitize_input, deleted in one translate pass
+_SANITIZE_TABLE = str.maketrans('', '', '<>"\'&;()')
+
+@dataclass(slots=True, frozen=True)
+class AuthUser:
+    """Authenticated user; immutable so cached instances can be shared between requests"""
+    id: str
+    email: Optional[str]
+    role: str
+    provider: str
 
 class SecurityManager:
     """Manages authentication and security operations"""
     
     def __init__(self):
         self._config = None
-        self.supabase_client: Optional[Client] = None
+        self.supabase_client: Optional['Client'] = None
+        self._jwks_client: Optional[jwt.PyJWKClient] = None
+        self._token_cache: OrderedDict[bytes, Tuple[AuthUser, float]] = OrderedDict()
+        self._token_cache_lock = threading.Lock()
     
     @property
     def config(self):
         """Lazy load config to avoid import errors"""
         if self._config is None:
             try:
-                self._config = Config()
+                self._config = get_config()
             except Exception as e:
                 # If config fails to load, create a minimal config for development
                 self._config = type('MockConfig', (), {
                     'SUPABASE_URL': None,
-                    'SUPABASE_ANON_KEY': None
+                    'SUPABASE_ANON_KEY': None,
+                    'ALLOW_UNVERIFIED_JWT': False
                 })()
         return self._config
     
@@ -29,44 +73,123 @@ class SecurityManager:
         """Initialize Supabase client if not already done"""
         if self.supabase_client is None and self.config.SUPABASE_URL and self.config.SUPABASE_SERVICE_ROLE_KEY:
             try:
+                # Imported on first use: the supabase package is slow to import and unused without credentials
+                from supabase import create_client
                 self.supabase_client = create_client(
                     self.config.SUPABASE_URL,
                     self.config.SUPABASE_SERVICE_ROLE_KEY
                 )
-            except Exception:
-                pass
+            except Exception as e:
+                logger.warning("Supabase client unavailable, tokens can only be verified locally: %s", e)
+    
+    def _init_jwks_client(self):
+        """Initialize the JWKS client if not already done and asymmetric algorithms are available"""
+        if self._jwks_client is None and has_crypto and self.config.SUPABASE_URL:
+            self._jwks_client = jwt.PyJWKClient(self.config.SUPABASE_URL.rstrip('/') + _JWKS_PATH)
+    
+    def _validate_jwt_locally(self, token: str) -> Optional[AuthUser]:
+        """Verify an asymmetrically signed Supabase token against the cached JWKS, or None if that isn't possible;
+        raises if the token fails verification against its key"""
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get('alg') not in _JWKS_ALGORITHMS or not header.get('kid'):
+                return None
+            
+            self._init_jwks_client()
+            if self._jwks_client is None:
+                return None
+            
+            signing_key = self._jwks_client.get_signing_key_from_jwt(token)
+            payload = jwt.decode(token, signing_key.key, algorithms=[header['alg']], audience=_JWT_AUDIENCE)
+        except (jwt.InvalidSignatureError, jwt.InvalidAudienceError, jwt.ExpiredSignatureError) as e:
+            # The key was found and the token failed against it: no other check may accept it
+            raise Exception(f"Invalid JWT token: {str(e)}")
+        except jwt.PyJWTError as e:
+            logger.debug("Local JWT verification unavailable, deferring to Supabase: %s", e)
+            return None
+        
+        if not payload.get('sub'):
+            return None
+        
+        return AuthUser(
+            id=payload['sub'],
+            email=payload.get('email'),
+            role='user',
+            provider='supabase'
+        )
     
-    def validate_jwt_token(self, token: str) -> Dict[str, Any]:
-        """Validate JWT token and return user information"""
+    def validate_jwt_token(self, token: str) -> AuthUser:
+        """Validate JWT token and return user information, reusing recent results for the same token"""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        now = time.time()
+        
+        with self._token_cache_lock:
+            entry = self._token_cache.get(digest)
+            if entry is not None:
+                if entry[1] > now:
+                    self._token_cache.move_to_end(digest)
+                    return entry[0]
+                del self._token_cache[digest]
+        
+        # Read exp locally first: expired tokens are rejected without any further check,
+        # and for live ones it bounds the cache TTL
+        expires_at = now + _TOKEN_CACHE_MAX_TTL
         try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get('exp')
+            if isinstance(exp, (int, float)):
+                expires_at = min(expires_at, exp)
+        except jwt.InvalidTokenError:
+            pass  # Opaque tokens accepted by Supabase just get the default TTL
+        
+        if expires_at <= now:
+            raise Exception("Token validation failed: token has expired")
+        
+        user = self._validate_jwt_uncached(token)
+        
+        with self._token_cache_lock:
+            self._token_cache[digest] = (user, expires_at)
+            if len(self._token_cache) > _TOKEN_CACHE_SIZE:
+                self._token_cache.popitem(last=False)
+        
+        return user
+    
+    def _validate_jwt_uncached(self, token: str) -> AuthUser:
+        """Validate JWT token locally or against Supabase, decoding it unverified only in development"""
+        try:
+            # Tokens signed with a published Supabase key are verified without a network round-trip
+            user = self._validate_jwt_locally(token)
+            if user is not None:
+                return user
+            
             # Initialize Supabase client if needed
             self._init_supabase_client()
             
-            # First try to validate with Supabase
+            # Otherwise try to validate with Supabase
             if self.supabase_client:
                 try:
                     user = self.supabase_client.auth.get_user(token)
                     if user and user.user:
-                        return {
-                            'id': user.user.id,
-                            'email': user.user.email,
-                            'role': 'user',
-                            'provider': 'supabase'
-                        }
+                        return AuthUser(
+                            id=user.user.id,
+                            email=user.user.email,
+                            role='user',
+                            provider='supabase'
+                        )
                 except Exception as e:
-                    pass
+                    logger.warning("Supabase token check failed: %s", e)
             
-            # Fallback to manual JWT validation
-            return self._validate_jwt_manually(token)
+            # Unverified decoding is a development-only escape hatch, off unless explicitly configured
+            if self.config.ALLOW_UNVERIFIED_JWT:
+                return self._validate_jwt_manually(token)
+            
+            raise Exception("token could not be verified")
             
         except Exception as e:
             raise Exception(f"Token validation failed: {str(e)}")
     
-    def _validate_jwt_manually(self, token: str) -> Dict[str, Any]:
-        """Manual JWT validation as fallback"""
+    def _validate_jwt_manually(self, token: str) -> AuthUser:
+        """Decode a JWT without verifying its signature; only used when ALLOW_UNVERIFIED_JWT is set"""
         try:
-            # Decode JWT without verification (for development)
-            # In production, you should verify the signature
             payload = jwt.decode(token, options={"verify_signature": False})
             
             # Extract user information
@@ -76,17 +199,17 @@ class SecurityManager:
             if not user_id:
                 raise Exception("Invalid token payload")
             
-            return {
-                'id': user_id,
-                'email': email,
-                'role': payload.get('role', 'user'),
-                'provider': 'jwt'
-            }
+            return AuthUser(
+                id=user_id,
+                email=email,
+                role=payload.get('role', 'user'),
+                provider='jwt'
+            )
             
         except jwt.InvalidTokenError as e:
             raise Exception(f"Invalid JWT token: {str(e)}")
     
-    def verify_supabase_token(self, token: str) -> Optional[Dict[str, Any]]:
+    def verify_supabase_token(self, token: str) -> Optional[AuthUser]:
         """Verify token specifically with Supabase"""
         self._init_supabase_client()
         
@@ -98,12 +221,12 @@ class SecurityManager:
             user = self.supabase_client.auth.get_user(token)
             
             if user and user.user:
-                return {
-                    'id': user.user.id,
-                    'email': user.user.email,
-                    'role': 'user',
-                    'provider': 'supabase'
-                }
+                return AuthUser(
+                    id=user.user.id,
+                    email=user.user.email,
+                    role='user',
+                    provider='supabase'
+                )
             
             return None
             
@@ -133,39 +256,24 @@ class SecurityManager:
         except Exception:
             return None
     
-    def validate_permissions(self, user: Dict[str, Any], required_permission: str) -> bool:
+    def validate_permissions(self, user: AuthUser, required_permission: str) -> bool:
         """Validate if user has required permission"""
         # Basic permission checking
-        user_role = user.get('role', 'user')
-        
-        # Define permission hierarchy
-        permissions = {
-            'admin': ['read', 'write', 'delete', 'admin'],
-            'user': ['read', 'write'],
-            'guest': ['read']
-        }
-        
-        user_permissions = permissions.get(user_role, [])
-        return required_permission in user_permissions
+        return required_permission in _ROLE_PERMISSIONS.get(user.role, frozenset())
     
     def sanitize_input(self, input_data: str) -> str:
         """Basic input sanitization"""
         # Remove potentially dangerous characters
-        dangerous_chars = ['<', '>', '"', "'", '&', ';', '(', ')']
-        sanitized = input_data
-        
-        for char in dangerous_chars:
-            sanitized = sanitized.replace(char, '')
-        
-        return sanitized.strip()
+        return input_data.translate(_SANITIZE_TABLE).strip()
     
     def validate_file_type(self, filename: str, allowed_types: set) -> bool:
-        """Validate file type based on extension"""
-        if not filename or '.' not in filename:
+        """Validate file type based on extension; allowed_types holds lowercase extensions"""
+        if not filename:
             return False
         
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        return file_extension in allowed_types
+        # rpartition returns a fixed tuple instead of building a list like rsplit
+        _, dot, file_extension = filename.rpartition('.')
+        return bool(dot) and file_extension.lower() in allowed_types
     
     def validate_file_size(self, file_size: int, max_size: int) -> bool:
         """Validate file size"""
@@ -173,28 +281,25 @@ class SecurityManager:
     
     def generate_secure_filename(self, original_filename: str) -> str:
         """Generate a secure filename"""
-        import uuid
-        import os
-        
         # Get file extension
         file_extension = os.path.splitext(original_filename)[1]
         
         # Generate unique filename
-        secure_filename = f"{uuid.uuid4()}{file_extension}"
+        secure_filename = f"{secrets.token_hex(16)}{file_extension}"
         
         return secure_filename
 
 # Global instance
 security_manager = SecurityManager()
 
-def validate_jwt_token(token: str) -> Dict[str, Any]:
+def validate_jwt_token(token: str) -> AuthUser:
     """Convenience function to validate JWT token"""
     return security_manager.validate_jwt_token(token)
 
-def verify_supabase_token(token: str) -> Optional[Dict[str, Any]]:
+def verify_supabase_token(token: str) -> Optional[AuthUser]:
     """Convenience function to verify Supabase token"""
     return security_manager.verify_supabase_token(token)
 
-def validate_permissions(user: Dict[str, Any], required_permission: str) -> bool:
+def validate_permissions(user: AuthUser, required_permission: str) -> bool:
     """Convenience function to validate user permissions"""
     return security_manager.validate_permissions(user, required_permission)